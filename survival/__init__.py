@@ -0,0 +1,5 @@
+"""Mystical Survival Game: a procedurally generated forest with top-down and first-person views
+
+The game loop lives in survival.game; main.py at the repository root is the entry point
+for both the desktop game and the pygbag browser build.
+"""
@@ -0,0 +1,390 @@
+"""Benchmarks run with --benchmark instead of the game"""
+
+import json
+import math
+import platform
+import random
+import time
+
+import pygame
+
+from . import config
+from .config import (
+    INITIAL_WINDOW_WIDTH, INITIAL_WINDOW_HEIGHT, TILE_SIZE, ITEM_SIZE, INITIAL_TREE_DENSITY, BLACK, np,
+)
+from .tiles import TileGrid
+from .items import ITEM_TYPES, ItemStore
+from .player import Player
+from .camera import Camera
+from .controls import INPUT_UP, INPUT_LEFT, INPUT_RIGHT, INPUT_ROTATE_LEFT, INPUT_ROTATE_RIGHT
+from .env import VectorEnv
+from .navigation import STEPS
+from .generation import forest_step_array, forest_step, spawn_items, build_map, run_to_completion
+from .world import GameMap
+
+
+def benchmark_generation(sizes, backends, seed):
+    """Check both backends apply the same rules, then time full map generation"""
+    seed = seed if seed is not None else 0
+    if np is not None:
+        noise = (np.random.default_rng(seed).random((64, 64)) < INITIAL_TREE_DENSITY).astype(np.uint8)
+        stepped = run_to_completion(forest_step(TileGrid.from_array(noise)))
+        matches = stepped.data == forest_step_array(noise).tobytes()
+        print(f"forest_step matches forest_step_array: {matches}")
+    else:
+        print("NumPy is not installed: skipping the cross-backend check and the numpy backend")
+        backends = [backend for backend in backends if backend != "numpy"]
+
+    for size in sizes:
+        for backend in backends:
+            start = time.perf_counter()
+            tiles, items = run_to_completion(build_map(size, size, seed, config.USE_CLUSTERING, backend))
+            elapsed = time.perf_counter() - start
+            print(f"{size}x{size} {backend}: {elapsed:.3f}s "
+                  f"({size * size / elapsed / 1e6:.2f} Mtiles/s, {len(items)} items)")
+
+
+def benchmark_items(counts, seed):
+    """Time batch spawning and the per-frame item work on open maps holding many items"""
+    rng = random.Random(seed if seed is not None else 0)
+    screen = pygame.Surface((INITIAL_WINDOW_WIDTH, INITIAL_WINDOW_HEIGHT))
+    for count in counts:
+        # About one item every two tiles, on an open map
+        side = math.isqrt(count * 2) + 1
+        game_map = GameMap(INITIAL_WINDOW_WIDTH, INITIAL_WINDOW_HEIGHT, seed)
+        game_map.set_tiles(TileGrid(side, side))
+        type_codes = [rng.randrange(len(ITEM_TYPES)) for _ in range(count)]
+        xs = [rng.uniform(0, side * TILE_SIZE - ITEM_SIZE) for _ in range(count)]
+        ys = [rng.uniform(0, side * TILE_SIZE - ITEM_SIZE) for _ in range(count)]
+
+        start = time.perf_counter()
+        items = ItemStore()
+        items.add_many(type_codes, xs, ys)
+        game_map.set_items(items)
+        spawn_ms = (time.perf_counter() - start) * 1000
+
+        player = Player(0, 0)
+        positions = [(rng.uniform(0, side * TILE_SIZE), rng.uniform(0, side * TILE_SIZE), rng.uniform(0, 2 * math.pi))
+                     for _ in range(200)]
+        timings = {"pickup": 0, "sprites": 0, "draw": 0}
+        for x, y, angle in positions:
+            player.x, player.y, player.angle = x, y, angle
+            start = time.perf_counter()
+            player.try_pickup_items(game_map)
+            pickup_done = time.perf_counter()
+            player.project_items(game_map, INITIAL_WINDOW_WIDTH)
+            sprites_done = time.perf_counter()
+            # The top-down item pass, for a screen-sized view at the player
+            items.draw(screen, items.in_rect(x - INITIAL_WINDOW_WIDTH/2, y - INITIAL_WINDOW_HEIGHT/2,
+                                             x + INITIAL_WINDOW_WIDTH/2, y + INITIAL_WINDOW_HEIGHT/2),
+                       (INITIAL_WINDOW_WIDTH/2 - x, INITIAL_WINDOW_HEIGHT/2 - y))
+            draw_done = time.perf_counter()
+            timings["pickup"] += pickup_done - start
+            timings["sprites"] += sprites_done - pickup_done
+            timings["draw"] += draw_done - sprites_done
+
+        start = time.perf_counter()
+        game_map.minimap.rebuild()
+        minimap_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        game_map.remove_items(rng.sample(list(items), len(items) // 10))
+        remove_ms = (time.perf_counter() - start) * 1000
+
+        frame = " ".join(f"{phase}={elapsed / len(positions) * 1000:.3f}ms" for phase, elapsed in timings.items())
+        print(f"{count} items: spawn {spawn_ms:.1f}ms, per frame {frame}, "
+              f"minimap rebuild {minimap_ms:.1f}ms, remove 10% {remove_ms:.1f}ms")
+
+
+def benchmark_topdown(sizes, seed):
+    """Time top-down frames while walking across maps of each size, against a window-sized map"""
+    screen = pygame.Surface((INITIAL_WINDOW_WIDTH, INITIAL_WINDOW_HEIGHT))
+    camera = Camera(INITIAL_WINDOW_WIDTH, INITIAL_WINDOW_HEIGHT)
+    seed = seed if seed is not None else 0
+    maps = [("window", INITIAL_WINDOW_WIDTH, INITIAL_WINDOW_HEIGHT)]
+    maps += [(f"{size}x{size}", size * TILE_SIZE, size * TILE_SIZE) for size in sizes]
+    for name, pixel_width, pixel_height in maps:
+        start = time.perf_counter()
+        game_map = GameMap(pixel_width, pixel_height, seed)
+        generate_ms = (time.perf_counter() - start) * 1000
+
+        # Walk diagonally from the middle at four times the player's speed, drawing every frame
+        player = Player(pixel_width / 2, pixel_height / 2)
+        frames = []
+        for _ in range(300):
+            player.x = min(player.x + 4 * player.speed, pixel_width - player.width)
+            player.y = min(player.y + 2 * player.speed, pixel_height - player.height)
+            start = time.perf_counter()
+            screen.fill(BLACK)
+            camera.follow(player, game_map)
+            game_map.reveal_around(player)
+            game_map.draw(screen, camera)
+            player.draw(screen, camera.offset())
+            frames.append(time.perf_counter() - start)
+        # The first frame builds every visible terrain block; later ones only those scrolling in
+        first = frames.pop(0)
+        frames.sort()
+        print(f"{name}: generate {generate_ms:.0f}ms, first frame {first * 1000:.3f}ms, then "
+              f"p50={frames[len(frames) // 2] * 1000:.3f}ms p99={frames[len(frames) * 99 // 100] * 1000:.3f}ms")
+
+
+def benchmark_env(env_counts, workers, seed):
+    """Environment steps per second for batches of worlds stepped together, without rendering"""
+    rng = random.Random(seed if seed is not None else 0)
+    actions = [INPUT_UP, INPUT_UP | INPUT_ROTATE_LEFT, INPUT_UP | INPUT_ROTATE_RIGHT, INPUT_LEFT, INPUT_RIGHT]
+    for count in env_counts:
+        envs = VectorEnv(count, workers=workers, seed=rng.getrandbits(32))
+        envs.reset()
+        steps = max(50, 20000 // count)
+        batches = [[rng.choice(actions) for _ in range(count)] for _ in range(steps)]
+        start = time.perf_counter()
+        for batch in batches:
+            envs.step(batch)
+        elapsed = time.perf_counter() - start
+        envs.close()
+        rate = steps * count / elapsed
+        print(f"{count} worlds, {workers or 'no'} workers: {rate:.0f} steps/s "
+              f"({rate / max(1, workers):.0f} per core), {elapsed / steps * 1000:.3f}ms per batch")
+
+
+def benchmark_navigation(agent_counts, seed):
+    """Flow-field steering for many agents chasing a moving target, against A* per agent"""
+    rng = random.Random(seed if seed is not None else 0)
+    side = 256
+    game_map = GameMap(side * TILE_SIZE, side * TILE_SIZE, seed if seed is not None else 0)
+    navigator = game_map.navigator()
+    radius = navigator.radius
+    center = game_map.open_tile_near(side // 2, side // 2)
+    for count in agent_counts:
+        # Agents start on open tiles around the target, which wanders a tile every 8 ticks
+        agents = []
+        while len(agents) < count:
+            tile = (center[0] + rng.randint(-radius, radius), center[1] + rng.randint(-radius, radius))
+            if not game_map.is_tree(*tile):
+                agents.append(tile)
+        sample = agents[:100]
+        target = center
+        navigator.invalidate()
+        rebuilds = navigator.rebuilds
+        rebuild_time = query_time = 0
+        ticks = 240
+        for tick in range(ticks):
+            if tick % 8 == 0:
+                dx, dy = rng.choice(STEPS)
+                if not game_map.is_tree(target[0] + dx, target[1] + dy):
+                    target = (target[0] + dx, target[1] + dy)
+            start = time.perf_counter()
+            navigator.set_target(*target)
+            targeted = time.perf_counter()
+            moves = [navigator.next_step(x, y) for x, y in agents]
+            query_done = time.perf_counter()
+            rebuild_time += targeted - start
+            query_time += query_done - targeted
+            if tick % 4 == 0:
+                agents = [(x + move[0], y + move[1]) if move else (x, y) for (x, y), move in zip(agents, moves)]
+        rebuilds = navigator.rebuilds - rebuilds
+
+        # One-off routes from a sample of starting positions, searched and then served from the cache
+        navigator.path_cache.clear()
+        start = time.perf_counter()
+        for agent in sample:
+            navigator.find_path(agent, target)
+        searched = time.perf_counter()
+        for agent in sample:
+            navigator.find_path(agent, target)
+        cached = time.perf_counter()
+        search_ms = (searched - start) / len(sample) * 1000
+        print(f"{count} agents: {query_time / ticks * 1000:.3f}ms per tick for every agent's next step "
+              f"({query_time / ticks / count * 1e6:.2f}us each), {rebuilds} field rebuilds averaging "
+              f"{rebuild_time / max(1, rebuilds) * 1000:.2f}ms; A* {search_ms:.3f}ms per route "
+              f"({search_ms * count:.0f}ms per tick for every agent), "
+              f"{(cached - searched) / len(sample) * 1e6:.2f}us cached")
+
+
+SUITE_CASES = ["cast_rays", "check_collision", "generate_clustered_map", "spawn_items", "try_pickup_items",
+               "draw_3d", "draw_minimap"]
+SUITE_MIN_SECONDS = 0.3  # Each case repeats until it has run this long and taken SUITE_MIN_SAMPLES samples
+SUITE_MIN_SAMPLES = 5
+SUITE_MAX_SAMPLES = 2000
+
+
+def measure(call, batch=1, prepare=None):
+    """Time call(i) for calls i, batch calls per sample after one untimed warm-up sample
+
+    Returns the per-call latency of every sample in seconds; a batch spreads calls too
+    quick for the timer over one reading. prepare(first), if given, runs untimed before
+    each sample, with the index of the sample's first call.
+    """
+    latencies = []
+    spent = 0
+    sample = 0
+    while sample <= SUITE_MAX_SAMPLES and (sample <= SUITE_MIN_SAMPLES or spent < SUITE_MIN_SECONDS):
+        first = sample * batch
+        if prepare is not None:
+            prepare(first)
+        start = time.perf_counter()
+        for i in range(first, first + batch):
+            call(i)
+        elapsed = time.perf_counter() - start
+        if sample > 0:
+            latencies.append(elapsed / batch)
+            spent += elapsed
+        sample += 1
+    return latencies
+
+
+def suite_result(name, params, latencies, batch):
+    ordered = sorted(latencies)
+    p50, p95, p99 = (ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1e6 for q in (0.50, 0.95, 0.99))
+    return {"case": name, "params": params, "samples": len(latencies), "batch": batch,
+            "ops_per_s": len(latencies) / sum(latencies), "p50_us": p50, "p95_us": p95, "p99_us": p99}
+
+
+def result_key(result):
+    """Name a result by its case and parameters, e.g. cast_rays[engine=scalar,map=64,rays=120]"""
+    params = ",".join(f"{name}={value}" for name, value in sorted(result["params"].items()))
+    return f"{result['case']}[{params}]"
+
+
+def sample_positions(game_map, rng, count):
+    """Player positions (x, y, angle) on open tiles of a bounded map"""
+    positions = []
+    while len(positions) < count:
+        tile_x, tile_y = rng.randrange(game_map.width), rng.randrange(game_map.height)
+        if not game_map.is_tree(tile_x, tile_y):
+            positions.append((tile_x * TILE_SIZE + rng.uniform(0, TILE_SIZE / 2),
+                              tile_y * TILE_SIZE + rng.uniform(0, TILE_SIZE / 2), rng.uniform(0, 2 * math.pi)))
+    return positions
+
+
+def scatter_items(game_map, rng, density):
+    """Replace a map's items with density items per tile at uniform positions"""
+    count = int(game_map.width * game_map.height * density)
+    items = ItemStore()
+    items.add_many([rng.randrange(len(ITEM_TYPES)) for _ in range(count)],
+                   [rng.uniform(0, game_map.pixel_width - ITEM_SIZE) for _ in range(count)],
+                   [rng.uniform(0, game_map.pixel_height - ITEM_SIZE) for _ in range(count)])
+    game_map.set_items(items)
+
+
+def benchmark_suite(sizes, densities, ray_counts, seed, cases=None):
+    """Latency percentiles and throughput of the hot paths, swept over map size, item density and ray count
+
+    Every input is drawn from seed, so runs differ only in timing. Returns the results as
+    a list of dicts (see suite_result) for saving and comparing against a baseline.
+    """
+    seed = seed if seed is not None else 0
+    cases = cases or SUITE_CASES
+    engines = ["scalar", "vectorized"] if np is not None else ["scalar"]
+    screen = pygame.Surface((INITIAL_WINDOW_WIDTH, INITIAL_WINDOW_HEIGHT))
+    results = []
+
+    def run(name, params, call, batch=1, prepare=None):
+        result = suite_result(name, params, measure(call, batch, prepare), batch)
+        results.append(result)
+        print(f"{result_key(result)}: {result['ops_per_s']:.1f}/s "
+              f"p50={result['p50_us']:.1f}us p95={result['p95_us']:.1f}us p99={result['p99_us']:.1f}us")
+
+    def cast(player, game_map, engine, count):
+        if engine == "vectorized":
+            return player.cast_rays_vectorized(game_map, count)
+        return player.cast_rays(game_map, count)
+
+    for size in sizes:
+        rng = random.Random(seed)
+        if "generate_clustered_map" in cases:
+            run("generate_clustered_map", {"map": size},
+                lambda i: run_to_completion(build_map(size, size, seed + i, True)))
+        if "spawn_items" in cases:
+            tiles, _ = run_to_completion(build_map(size, size, seed, True))
+            run("spawn_items", {"map": size}, lambda i: run_to_completion(spawn_items(tiles, random.Random(seed + i))))
+        if not {"cast_rays", "check_collision", "try_pickup_items", "draw_minimap"} & set(cases):
+            continue
+
+        game_map = GameMap(size * TILE_SIZE, size * TILE_SIZE, seed)
+        player = Player(0, 0)
+        positions = sample_positions(game_map, rng, 256)
+
+        def place(i):
+            player.x, player.y, player.angle = positions[i % len(positions)]
+
+        if "cast_rays" in cases:
+            for engine in engines:
+                for count in ray_counts:
+                    run("cast_rays", {"map": size, "engine": engine, "rays": count},
+                        lambda i: (place(i), cast(player, game_map, engine, count)))
+        if "check_collision" in cases:
+            # Anywhere on the map, so tree-free neighbourhoods and near misses are both covered
+            points = [(rng.uniform(0, game_map.pixel_width), rng.uniform(0, game_map.pixel_height)) for _ in range(4096)]
+            run("check_collision", {"map": size},
+                lambda i: player.check_collision(*points[i % len(points)], game_map), batch=1000)
+        for density in densities:
+            if "try_pickup_items" in cases:
+                scatter_items(game_map, random.Random(seed), density)
+                picked = []
+
+                def pick(i):
+                    # Note what is in reach so prepare can put it back, keeping the density steady
+                    items = game_map.items
+                    picked[:] = [(items.types[slot], items.xs[slot], items.ys[slot])
+                                 for slot in items.query(player.x + player.width/2, player.y + player.height/2,
+                                                         player.pickup_range)]
+
+                def restore(i):
+                    if picked:
+                        game_map.items.add_many(*zip(*picked))
+                    place(i)
+                    pick(i)
+                run("try_pickup_items", {"map": size, "density": density},
+                    lambda i: player.try_pickup_items(game_map), prepare=restore)
+            if "draw_minimap" in cases:
+                scatter_items(game_map, random.Random(seed), density)
+                run("draw_minimap", {"map": size, "density": density},
+                    lambda i: (place(i), game_map.draw_minimap(screen, player)))
+
+    if "draw_3d" in cases:
+        # The view does not depend on the map size; one mid-sized map stands in for all
+        game_map = GameMap(256 * TILE_SIZE, 256 * TILE_SIZE, seed)
+        player = Player(0, 0)
+        positions = sample_positions(game_map, random.Random(seed), 64)
+        for engine in engines:
+            for count in ray_counts:
+                views = []
+                for x, y, angle in positions:
+                    player.x, player.y, player.angle = x, y, angle
+                    views.append(((x, y, angle), cast(player, game_map, engine, count)))
+
+                def draw(i):
+                    (player.x, player.y, player.angle), rays = views[i % len(views)]
+                    player.draw_3d(screen, rays, game_map)
+                run("draw_3d", {"engine": engine, "rays": count}, draw)
+    return results
+
+
+def save_results(path, results, seed):
+    with open(path, "w") as f:
+        json.dump({"seed": seed, "python": platform.python_version(), "pygame": pygame.version.ver,
+                   "numpy": np.__version__ if np is not None else None, "results": results}, f, indent=1)
+
+
+def compare_results(results, baseline_path, threshold):
+    """Print each result's median latency against a baseline file; returns the keys slower by more than threshold
+
+    threshold is a fraction: 0.1 flags medians more than 10% above the baseline's.
+    Results with no counterpart in the baseline are listed but never flagged.
+    """
+    with open(baseline_path) as f:
+        baseline = {result_key(result): result for result in json.load(f)["results"]}
+    regressions = []
+    for result in results:
+        key = result_key(result)
+        if key not in baseline:
+            print(f"{key}: not in baseline")
+            continue
+        change = result["p50_us"] / baseline[key]["p50_us"] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(key)
+            flag = " REGRESSION"
+        print(f"{key}: p50 {baseline[key]['p50_us']:.1f}us -> {result['p50_us']:.1f}us ({change:+.1%}){flag}")
+    return regressions
@@ -0,0 +1,53 @@
+"""Top-down camera following the player"""
+
+import math
+
+from .config import TILE_SIZE
+
+
+class Camera:
+    """Screen-sized viewport into the world, converting world pixels to screen pixels
+
+    On a bounded map the view stops at the map edges, so a map no larger than the screen
+    stays where it was drawn before the camera existed: at the top-left corner.
+    """
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.x = 0  # World pixel shown at the top-left corner of the screen
+        self.y = 0
+
+    def resize(self, width, height):
+        self.width = width
+        self.height = height
+
+    def follow(self, player, game_map):
+        """Centre the view on the player, clamped to the map on bounded maps"""
+        x = int(player.x + player.width/2 - self.width / 2)
+        y = int(player.y + player.height/2 - self.height / 2)
+        if game_map.bounded:
+            x = max(0, min(x, game_map.pixel_width - self.width))
+            y = max(0, min(y, game_map.pixel_height - self.height))
+        self.x = x
+        self.y = y
+
+    def offset(self):
+        """Amount added to world coordinates to get screen coordinates"""
+        return (-self.x, -self.y)
+
+    def to_screen(self, x, y):
+        return (x - self.x, y - self.y)
+
+    def to_world(self, screen_x, screen_y):
+        return (screen_x + self.x, screen_y + self.y)
+
+    def visible_rect(self, margin=0):
+        """World pixel rectangle (left, top, right, bottom) on screen, grown by margin on every side"""
+        return (self.x - margin, self.y - margin, self.x + self.width + margin, self.y + self.height + margin)
+
+    def visible_tiles(self, margin=0):
+        """Tile range (left, top, right, bottom), right and bottom exclusive, covering the screen
+        plus margin tiles on every side"""
+        return (self.x // TILE_SIZE - margin, self.y // TILE_SIZE - margin,
+                math.ceil((self.x + self.width) / TILE_SIZE) + margin,
+                math.ceil((self.y + self.height) / TILE_SIZE) + margin)
@@ -0,0 +1,78 @@
+"""Constants and settings shared by the game modules
+
+Settings the game changes while running (USE_CLUSTERING, MAP_LOCKED, WALL_TEXTURES, FOG_OF_WAR,
+GENERATION_BACKEND on replay and the values set from the command line) are read as config.NAME
+so every module sees the change. np is NumPy, or None when it is not installed; the other
+modules import it from here.
+"""
+
+import math
+import sys
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; every module's array paths fall back to pure Python
+    np = None
+
+
+INITIAL_WINDOW_WIDTH = 800
+INITIAL_WINDOW_HEIGHT = 600
+TILE_SIZE = 32
+PLAYER_SIZE = 20
+ITEM_SIZE = 16
+INITIAL_TREE_DENSITY = 0.35
+ITEM_SPAWN_CHANCE = 0.02  # 2% chance per empty tile
+FOREST_ITERATIONS = 2
+USE_CLUSTERING = True
+MAP_LOCKED = False
+FOV = math.pi / 3  # 60 degrees field of view
+NUM_RAYS = 120  # Number of rays to cast
+MAX_DEPTH = 800  # Maximum ray distance
+MIN_DISTANCE = 0.1  # Minimum ray distance to prevent division by zero
+MOVEMENT_SPEED = 4
+ROTATION_SPEED = 0.04
+BASE_TICK_RATE = 60  # MOVEMENT_SPEED and ROTATION_SPEED are per tick at this rate
+SIM_RATE = 60  # Fixed simulation ticks per second (--sim-rate, or the rate a replay was recorded at)
+RENDER_RATE = 60  # Frame cap; 0 renders as fast as possible (--render-rate)
+MAX_CATCH_UP_STEPS = 5  # Ticks per frame before backlog is dropped (--max-catch-up)
+RAY_ENGINE = "vectorized" if np is not None else "scalar"
+VECTORIZED_NUM_RAYS = None  # None casts one ray per screen column
+GENERATION_BACKEND = "numpy" if np is not None else "python"
+WALL_TEXTURES = False  # Textured first-person walls (NumPy column renderer only); toggle with T
+TEXTURE_SIZE = 64  # Texels per wall texture side
+SHADE_LEVELS = 64  # Pre-shaded copies of the wall texture
+INFINITE_WORLD = False  # Stream an unbounded chunked world instead of a bounded map (--infinite)
+MAP_SIZE = None  # Bounded map size in tiles as (width, height); None fits the map to the window (--map-size)
+TERRAIN_BLOCK_SIZE = 16  # Tiles per side of each pre-rendered top-down terrain block
+FOG_OF_WAR = True  # Hide unexplored tiles of the bounded map in the top-down view and minimap; toggle with F
+FOG_REVEAL_RADIUS = 6  # Tiles around the player explored in the top-down view
+CHUNK_SIZE = 16  # Tiles per chunk side
+CHUNK_VIEW_DISTANCE = 2  # Chunks kept resident around the player in each direction
+SAVE_FILE = "savegame.bin"  # Quick save/load target for F5/F9
+MAX_RESIDENT_CHUNKS = 64  # Least recently used chunks beyond this are evicted
+CLEARANCE_CAP = 8  # Tree distances in the clearance field saturate at this many tiles
+SPAWN_CLEARANCE = 2  # Preferred tiles between a spawn point and the nearest tree
+FLOW_FIELD_RADIUS = 32  # Tiles around the target covered by the navigation flow field
+PATH_CACHE_SIZE = 256  # A* routes kept by the navigator
+PATH_SEARCH_LIMIT = 20000  # Tiles an A* search may expand before giving up
+# Background map generation: a worker thread on desktop, time slices in the browser build
+MAP_WORKER = "cooperative" if sys.platform == "emscripten" else "thread"
+MAP_JOB_SLICE_MS = 4  # Generation time per frame for cooperative jobs
+MAP_STEP_TILES = 1 << 16  # Tiles per NumPy generation step, about a millisecond of work
+MAP_STEP_ITEMS = 512  # Items added to the ItemStore per generation step
+TEXT_CACHE_SIZE = 256  # Rendered text surfaces kept by the HUD
+# First-person quality presets, lowest first: (name, render scale, screen columns per ray)
+QUALITY_LEVELS = [("lowest", 0.5, 4), ("low", 0.5, 2), ("medium", 0.75, 2), ("high", 1.0, 2), ("ultra", 1.0, 1)]
+FRAME_BUDGET_MS = 1000 / 60  # Work time per frame the adaptive quality aims for
+QUALITY_WINDOW = 30  # Rendered frames per quality decision
+MEMORY_WARMUP_FRAMES = 30  # Frames left out of memory budgets while caches fill
+
+# Colors
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+GREEN = (0, 255, 0)
+BROWN = (139, 69, 19)
+RED = (255, 0, 0)
+YELLOW = (255, 255, 0)
+SKY_BLUE = (135, 206, 235)
+GROUND_GREEN = (34, 139, 34)
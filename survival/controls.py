@@ -0,0 +1,185 @@
+"""Per-tick input state, keyboard polling and input recordings"""
+
+import struct
+
+import pygame
+
+from .config import BASE_TICK_RATE
+
+
+# Input state for one tick: held keys in the low bits, keys pressed this tick above them
+INPUT_UP = 1 << 0
+INPUT_DOWN = 1 << 1
+INPUT_LEFT = 1 << 2
+INPUT_RIGHT = 1 << 3
+INPUT_ROTATE_LEFT = 1 << 4
+INPUT_ROTATE_RIGHT = 1 << 5
+PRESS_VIEW = 1 << 6
+PRESS_INVENTORY = 1 << 7
+PRESS_MINIMAP = 1 << 8
+PRESS_REGENERATE = 1 << 9
+PRESS_CLUSTERING = 1 << 10
+PRESS_LOCK = 1 << 11
+PRESS_INSTRUCTIONS = 1 << 12
+HELD_INPUTS = INPUT_UP | INPUT_DOWN | INPUT_LEFT | INPUT_RIGHT | INPUT_ROTATE_LEFT | INPUT_ROTATE_RIGHT
+EVENT_MAP_READY = 1 << 13  # Not a key: the tick a background-generated map was swapped in
+PRESS_BITS = {
+    pygame.K_v: PRESS_VIEW,
+    pygame.K_i: PRESS_INVENTORY,
+    pygame.K_m: PRESS_MINIMAP,
+    pygame.K_r: PRESS_REGENERATE,
+    pygame.K_c: PRESS_CLUSTERING,
+    pygame.K_l: PRESS_LOCK,
+    pygame.K_SLASH: PRESS_INSTRUCTIONS
+}
+
+# Scripted sessions for repeatable runs (--scenario): (ticks, input state) steps
+SCENARIOS = {
+    # Walks through every view and overlay: top-down, first person, inventory, minimap
+    "tour": [
+        (120, INPUT_DOWN | INPUT_RIGHT),
+        (1, PRESS_VIEW),
+        (120, INPUT_UP | INPUT_ROTATE_LEFT),
+        (1, PRESS_INVENTORY),
+        (60, INPUT_UP | INPUT_ROTATE_RIGHT),
+        (1, PRESS_INVENTORY),
+        (1, PRESS_MINIMAP),
+        (120, INPUT_DOWN | INPUT_ROTATE_LEFT),
+        (1, PRESS_MINIMAP),
+        (1, PRESS_VIEW),
+        (120, INPUT_UP | INPUT_LEFT),
+    ],
+}
+
+
+def poll_input():
+    """Read this tick's input from pygame as (state, quit_requested, other_keys_pressed)"""
+    state = 0
+    quit_requested = False
+    other_keys = []
+    for event in pygame.event.get():
+        if event.type == pygame.QUIT:
+            quit_requested = True
+        elif event.type == pygame.KEYDOWN:
+            if event.key in PRESS_BITS:
+                state |= PRESS_BITS[event.key]
+            else:
+                other_keys.append(event.key)
+
+    keys = pygame.key.get_pressed()
+    if keys[pygame.K_w] or keys[pygame.K_UP]:
+        state |= INPUT_UP
+    if keys[pygame.K_s] or keys[pygame.K_DOWN]:
+        state |= INPUT_DOWN
+    if keys[pygame.K_a] or keys[pygame.K_LEFT]:
+        state |= INPUT_LEFT
+    if keys[pygame.K_d] or keys[pygame.K_RIGHT]:
+        state |= INPUT_RIGHT
+    if keys[pygame.K_q]:
+        state |= INPUT_ROTATE_LEFT
+    if keys[pygame.K_e]:
+        state |= INPUT_ROTATE_RIGHT
+    return state, quit_requested, other_keys
+
+
+class InputRecording:
+    """Input state per tick, saved run-length encoded
+
+    File layout (little-endian): magic b"MSGI", uint16 version, uint64 seed,
+    uint8 flags, uint32 tick count, uint16 simulation rate, uint16 map width and
+    height in tiles, then (uint16 run length, uint16 state) pairs. A map size of 0x0
+    means the map was fitted to the window, as it always was before version 3.
+    From version 4 the flags also record the generation backend, since the NumPy and
+    pure-Python backends make different maps from the same seed; older files leave
+    the backend unknown (None).
+    Version 1 files have no simulation rate and ran at 60; those without map-ready
+    events predate background generation, so their regenerated maps are swapped in
+    as soon as they are requested.
+    """
+    MAGIC = b"MSGI"
+    VERSION = 4
+    HEADER = struct.Struct("<4sHQBIHHH")
+    HEADER_V2 = struct.Struct("<4sHQBIH")
+    HEADER_V1 = struct.Struct("<4sHQBI")
+    RUN = struct.Struct("<HH")
+    FLAG_INFINITE_WORLD = 1
+    FLAG_PYTHON_GENERATION = 2  # Maps came from the "python" backend; without it, "numpy"
+
+    def __init__(self, seed, flags=0, states=None, sim_rate=BASE_TICK_RATE, immediate_maps=False,
+                 map_size=None, backend=None):
+        self.seed = seed
+        self.flags = flags
+        self.backend = backend  # GENERATION_BACKEND the maps were generated with, if known
+        self.states = states if states is not None else []
+        self.sim_rate = sim_rate
+        self.immediate_maps = immediate_maps
+        self.map_size = map_size  # (width, height) in tiles, or None for a window-sized map
+
+    @classmethod
+    def from_script(cls, seed, script, flags=0, sim_rate=BASE_TICK_RATE, map_size=None, backend=None):
+        """Recording that holds each (ticks, state) step of a script for its tick count
+
+        Scripts carry no map-ready events, so maps they regenerate are swapped in at once.
+        """
+        states = []
+        for ticks, state in script:
+            states.extend([state] * ticks)
+        return cls(seed, flags, states, sim_rate, immediate_maps=True, map_size=map_size, backend=backend)
+
+    def __len__(self):
+        return len(self.states)
+
+    def append(self, state):
+        self.states.append(state)
+
+    def save(self, path):
+        runs = []
+        for state in self.states:
+            if runs and runs[-1][1] == state and runs[-1][0] < 0xFFFF:
+                runs[-1][0] += 1
+            else:
+                runs.append([1, state])
+        map_width, map_height = self.map_size or (0, 0)
+        flags = self.flags & ~self.FLAG_PYTHON_GENERATION
+        if self.backend == "python":
+            flags |= self.FLAG_PYTHON_GENERATION
+        with open(path, "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.VERSION, self.seed, flags, len(self.states),
+                                     self.sim_rate, map_width, map_height))
+            for run_length, state in runs:
+                f.write(self.RUN.pack(run_length, state))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < cls.HEADER_V1.size:
+            raise ValueError(f"{path} is not an input recording")
+        magic, version = struct.unpack_from("<4sH", data)
+        if magic != cls.MAGIC:
+            raise ValueError(f"{path} is not an input recording")
+        headers = {1: cls.HEADER_V1, 2: cls.HEADER_V2, 3: cls.HEADER, cls.VERSION: cls.HEADER}
+        if version not in headers:
+            raise ValueError(f"{path} has unsupported recording version {version}")
+        header = headers[version]
+        if len(data) < header.size or (len(data) - header.size) % cls.RUN.size:
+            raise ValueError(f"{path} is truncated")
+        map_width = map_height = 0
+        if version == 1:
+            _, _, seed, flags, tick_count = header.unpack_from(data)
+            sim_rate = BASE_TICK_RATE
+        elif version == 2:
+            _, _, seed, flags, tick_count, sim_rate = header.unpack_from(data)
+        else:
+            _, _, seed, flags, tick_count, sim_rate, map_width, map_height = header.unpack_from(data)
+        states = []
+        for run_length, state in cls.RUN.iter_unpack(data[header.size:]):
+            states.extend([state] * run_length)
+        if len(states) != tick_count:
+            raise ValueError(f"{path} is truncated: expected {tick_count} ticks, found {len(states)}")
+        immediate_maps = version == 1 and not any(state & EVENT_MAP_READY for state in states)
+        map_size = (map_width, map_height) if map_width and map_height else None
+        backend = None
+        if version >= 4:
+            backend = "python" if flags & cls.FLAG_PYTHON_GENERATION else "numpy"
+        return cls(seed, flags, states, sim_rate, immediate_maps, map_size, backend)
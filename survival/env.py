@@ -0,0 +1,309 @@
+"""Headless environments for driving the game from code: one world, or many stepped together"""
+
+import random
+
+from . import config
+from .config import TILE_SIZE, FOV, MAX_DEPTH, MIN_DISTANCE, np
+from .items import ITEM_TYPES
+from .player import Player
+from .world import GameMap, ChunkedGameMap
+from .controls import INPUT_UP, INPUT_DOWN, INPUT_LEFT, INPUT_RIGHT, INPUT_ROTATE_LEFT, INPUT_ROTATE_RIGHT
+
+
+OUTSIDE = 2  # Patch value for tiles beyond the edge of a bounded map
+
+
+class ForestEnv:
+    """One world stepped from code, without a window or any drawing
+
+    An action is an input state built from the held-input bits in controls (INPUT_UP,
+    INPUT_ROTATE_LEFT, ...), applied for one simulation tick with first-person movement.
+    step returns (observation, reward, done, info); the reward is the number of items
+    picked up during the tick. Observations are dicts:
+
+    - rays: fisheye-corrected wall distance per ray across the field of view, as in cast_rays
+    - patch: tiles within patch_radius of the player's tile, OUTSIDE past the map edge
+    - inventory: item counts in ITEM_TYPES order
+    - pose: player x, y and facing angle
+    """
+    def __init__(self, map_size=(64, 64), num_rays=32, patch_radius=4, max_steps=1000, infinite=False):
+        self.map_size = map_size
+        self.num_rays = num_rays
+        self.patch_radius = patch_radius
+        self.max_steps = max_steps
+        self.infinite = infinite
+        self.game_map = None
+        self.player = None
+
+    def reset(self, seed=None):
+        self.seed = seed if seed is not None else random.getrandbits(32)
+        if self.infinite:
+            self.game_map = ChunkedGameMap(self.seed)
+        else:
+            self.game_map = GameMap(self.map_size[0] * TILE_SIZE, self.map_size[1] * TILE_SIZE, self.seed)
+        self.player = Player(0, 0)
+        self.player.view_mode = "first_person"
+        self.player.x, self.player.y = self.player.find_safe_spawn(self.game_map)
+        self.game_map.update_streaming(self.player)
+        self.steps = 0
+        self.collected = 0
+        return self.observe()
+
+    def apply(self, action):
+        """Advance one tick, returning (reward, done)"""
+        player = self.player
+        if action & INPUT_ROTATE_LEFT:
+            player.rotate(-1)
+        if action & INPUT_ROTATE_RIGHT:
+            player.rotate(1)
+        dx = bool(action & INPUT_RIGHT) - bool(action & INPUT_LEFT)
+        dy = bool(action & INPUT_DOWN) - bool(action & INPUT_UP)
+        player.move(dx, dy, self.game_map)
+        self.game_map.update_streaming(player)
+        player.try_pickup_items(self.game_map)
+
+        collected = sum(player.inventory.items.values())
+        reward = collected - self.collected
+        self.collected = collected
+        self.steps += 1
+        done = self.steps >= self.max_steps or (self.game_map.bounded and not len(self.game_map.items))
+        return reward, done
+
+    def step(self, action):
+        reward, done = self.apply(action)
+        return self.observe(), reward, done, {"steps": self.steps, "seed": self.seed}
+
+    def observe(self):
+        player = self.player
+        if np is not None and config.RAY_ENGINE == "vectorized":
+            rays = player.cast_rays_vectorized(self.game_map, self.num_rays).depths.astype(np.float32)
+        else:
+            rays = [ray.distance for ray in player.cast_rays(self.game_map, self.num_rays)]
+        return {"rays": rays, "patch": self.patch(), "inventory": self.inventory(),
+                "pose": (player.x, player.y, player.angle)}
+
+    def patch(self):
+        """Tiles around the player as rows, top row first"""
+        player = self.player
+        center_x = int((player.x + player.width/2) // TILE_SIZE)
+        center_y = int((player.y + player.height/2) // TILE_SIZE)
+        radius = self.patch_radius
+        game_map = self.game_map
+        rows = [[game_map.get_tile(x, y) if game_map.in_bounds(x, y) else OUTSIDE
+                 for x in range(center_x - radius, center_x + radius + 1)]
+                for y in range(center_y - radius, center_y + radius + 1)]
+        return np.array(rows, dtype=np.uint8) if np is not None else rows
+
+    def inventory(self):
+        counts = [self.player.inventory.items.get(item_type, 0) for item_type in ITEM_TYPES]
+        return np.array(counts, dtype=np.int32) if np is not None else counts
+
+
+def cast_depths(grids, padding, xs, ys, facings, num_rays):
+    """Ray depths for many players at once, one row per player
+
+    grids is a (worlds, height, width) stack of tile arrays with padding (at least one)
+    extra tiles on every side; each player casts into its own world. The steps match
+    Player.cast_rays_vectorized, so a row equals that player's RayBatch.depths.
+    """
+    _, grid_height, grid_width = grids.shape
+    grid_height -= 2 * padding
+    grid_width -= 2 * padding
+    count = len(xs) * num_rays
+    world = np.repeat(np.arange(len(xs)), num_rays)
+    facing = np.repeat(facings, num_rays)
+    angles = facing - FOV/2 + np.tile(np.arange(num_rays) * (FOV / num_rays), len(xs))
+    ray_x = np.repeat(xs, num_rays)
+    ray_y = np.repeat(ys, num_rays)
+    ray_cos = np.cos(angles)
+    ray_sin = np.sin(angles)
+
+    start_x = (ray_x // TILE_SIZE).astype(np.intp)
+    start_y = (ray_y // TILE_SIZE).astype(np.intp)
+    step_x = np.where(ray_cos < 0, -1, 1)
+    step_y = np.where(ray_sin < 0, -1, 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        delta_dist_x = np.where(ray_cos != 0, np.abs(1 / ray_cos), np.inf)
+        delta_dist_y = np.where(ray_sin != 0, np.abs(1 / ray_sin), np.inf)
+        side_dist_x = np.where(ray_cos < 0,
+                               (ray_x - start_x * TILE_SIZE) / TILE_SIZE * delta_dist_x,
+                               ((start_x + 1) * TILE_SIZE - ray_x) / TILE_SIZE * delta_dist_x)
+        side_dist_y = np.where(ray_sin < 0,
+                               (ray_y - start_y * TILE_SIZE) / TILE_SIZE * delta_dist_y,
+                               ((start_y + 1) * TILE_SIZE - ray_y) / TILE_SIZE * delta_dist_y)
+
+    map_x = start_x.copy()
+    map_y = start_y.copy()
+    distance = np.zeros(count)
+    hit = np.zeros(count, dtype=bool)
+    active_idx = np.arange(count)
+    while active_idx.size:
+        with np.errstate(invalid='ignore'):
+            on_x = side_dist_x[active_idx] < side_dist_y[active_idx]
+        step_x_idx = active_idx[on_x]
+        step_y_idx = active_idx[~on_x]
+
+        side_dist_x[step_x_idx] += delta_dist_x[step_x_idx]
+        map_x[step_x_idx] += step_x[step_x_idx]
+        distance[step_x_idx] = side_dist_x[step_x_idx]
+
+        side_dist_y[step_y_idx] += delta_dist_y[step_y_idx]
+        map_y[step_y_idx] += step_y[step_y_idx]
+        distance[step_y_idx] = side_dist_y[step_y_idx]
+
+        cell_x = map_x[active_idx]
+        cell_y = map_y[active_idx]
+        inside = (cell_x >= 0) & (cell_x < grid_width) & (cell_y >= 0) & (cell_y < grid_height)
+        # Rays stop one step past the edge, so the padding keeps every lookup in range
+        wall = inside & (grids[world[active_idx], cell_y + padding, cell_x + padding] == 1)
+        hit[active_idx[wall]] = True
+
+        done = wall | ~inside | (distance[active_idx] >= MAX_DEPTH)
+        active_idx = active_idx[~done]
+
+    distances = np.where(hit, np.maximum(MIN_DISTANCE, distance * TILE_SIZE), MAX_DEPTH)
+    depths = np.maximum(MIN_DISTANCE, distances * np.cos(angles - facing))
+    return depths.reshape(len(xs), num_rays)
+
+
+class VectorEnv:
+    """num_envs independent bounded worlds stepped together
+
+    In one process the worlds share their array work: their grids are kept in one padded
+    stack, refreshed only for worlds whose map changed, so a single ray cast and a single
+    patch gather serve every world per step. With workers > 0 the worlds are instead
+    split across a process pool, each worker stepping its share this way.
+
+    Observations are ForestEnv's fields with a leading world axis (lists without NumPy).
+    Worlds that finish are reset straight away with a fresh seed, so the observation
+    returned for them starts the next episode. The shared grids need bounded maps, so
+    infinite=True is rejected; step chunked worlds one ForestEnv at a time instead.
+    """
+    def __init__(self, num_envs, workers=0, seed=None, **options):
+        if options.get("infinite"):
+            raise ValueError("VectorEnv only steps bounded worlds; use ForestEnv for the infinite world")
+        self.num_envs = num_envs
+        self.workers = workers
+        self.rng = random.Random(seed)
+        self.options = options
+        self.pool = []
+        if workers:
+            import multiprocessing  # Not available in the browser build; only loaded for pools
+            shares = [num_envs // workers + (i < num_envs % workers) for i in range(workers)]
+            for share in filter(None, shares):
+                parent, child = multiprocessing.Pipe()
+                process = multiprocessing.Process(target=_pool_worker, daemon=True,
+                                                  args=(child, share, self.rng.getrandbits(32), options))
+                process.start()
+                self.pool.append((parent, process, share))
+            return
+        self.envs = [ForestEnv(**options) for _ in range(num_envs)]
+        self.radius = self.envs[0].patch_radius
+        self.padding = max(1, self.radius)
+        self.grids = None
+        self.versions = [None] * num_envs
+
+    def reset(self, seeds=None):
+        seeds = list(seeds) if seeds is not None else [self.rng.getrandbits(32) for _ in range(self.num_envs)]
+        if self.pool:
+            start = 0
+            for conn, _, share in self.pool:
+                conn.send(("reset", seeds[start:start + share]))
+                start += share
+            return _concat([conn.recv() for conn, _, _ in self.pool])
+        for env, seed in zip(self.envs, seeds):
+            env.reset(seed)
+        return self.observe()
+
+    def step(self, actions):
+        """Apply one action per world; returns (observations, rewards, dones, infos)"""
+        if self.pool:
+            start = 0
+            for conn, _, share in self.pool:
+                conn.send(("step", list(actions[start:start + share])))
+                start += share
+            results = [conn.recv() for conn, _, _ in self.pool]
+            observations = _concat([result[0] for result in results])
+            rewards, dones, infos = [], [], []
+            for _, worker_rewards, worker_dones, worker_infos in results:
+                rewards.extend(worker_rewards)
+                dones.extend(worker_dones)
+                infos.extend(worker_infos)
+            if np is not None:
+                rewards, dones = np.array(rewards, dtype=np.int32), np.array(dones, dtype=bool)
+            return observations, rewards, dones, infos
+
+        rewards, dones, infos = [], [], []
+        for env, action in zip(self.envs, actions):
+            reward, done = env.apply(int(action))
+            rewards.append(reward)
+            dones.append(done)
+            infos.append({"steps": env.steps, "seed": env.seed})
+            if done:
+                env.reset(self.rng.getrandbits(32))
+        if np is not None:
+            rewards, dones = np.array(rewards, dtype=np.int32), np.array(dones, dtype=bool)
+        return self.observe(), rewards, dones, infos
+
+    def observe(self):
+        if np is None:
+            observations = [env.observe() for env in self.envs]
+            return {key: [observation[key] for observation in observations] for key in observations[0]}
+
+        padding = self.padding
+        width, height = self.envs[0].game_map.width, self.envs[0].game_map.height
+        if self.grids is None or self.grids.shape[1:] != (height + 2 * padding, width + 2 * padding):
+            self.grids = np.full((self.num_envs, height + 2 * padding, width + 2 * padding), OUTSIDE,
+                                 dtype=np.uint8)
+            self.versions = [None] * self.num_envs
+        for i, env in enumerate(self.envs):
+            if self.versions[i] != (env.game_map, env.game_map.version):
+                self.grids[i, padding:padding + height, padding:padding + width] = env.game_map.tile_array()
+                self.versions[i] = (env.game_map, env.game_map.version)
+
+        players = [env.player for env in self.envs]
+        xs = np.array([player.x + player.width/2 for player in players])
+        ys = np.array([player.y + player.height/2 for player in players])
+        angles = np.array([player.angle for player in players])
+        rays = cast_depths(self.grids, padding, xs, ys, angles, self.envs[0].num_rays).astype(np.float32)
+
+        # Patch rows and columns are offsets from each player's tile, shifted into the padding
+        offsets = np.arange(2 * self.radius + 1) + (padding - self.radius)
+        tile_x = (xs // TILE_SIZE).astype(np.intp)
+        tile_y = (ys // TILE_SIZE).astype(np.intp)
+        patch = self.grids[np.arange(self.num_envs)[:, None, None],
+                           tile_y[:, None, None] + offsets[None, :, None],
+                           tile_x[:, None, None] + offsets[None, None, :]]
+
+        inventory = np.array([[player.inventory.items.get(item_type, 0) for item_type in ITEM_TYPES]
+                              for player in players], dtype=np.int32)
+        pose = np.array([(player.x, player.y, player.angle) for player in players])
+        return {"rays": rays, "patch": patch, "inventory": inventory, "pose": pose}
+
+    def close(self):
+        for conn, process, _ in self.pool:
+            conn.send(("close", None))
+            process.join()
+        self.pool = []
+
+
+def _pool_worker(conn, num_envs, seed, options):
+    """Process pool side of VectorEnv: step a share of the worlds in-process"""
+    envs = VectorEnv(num_envs, seed=seed, **options)
+    while True:
+        command, payload = conn.recv()
+        if command == "reset":
+            conn.send(envs.reset(payload))
+        elif command == "step":
+            conn.send(envs.step(payload))
+        else:
+            conn.close()
+            return
+
+
+def _concat(observations):
+    """Join per-worker observation dicts along the world axis"""
+    if np is None:
+        return {key: [value for observation in observations for value in observation[key]]
+                for key in observations[0]}
+    return {key: np.concatenate([observation[key] for observation in observations]) for key in observations[0]}
@@ -0,0 +1,159 @@
+"""Fog of war: which tiles of a bounded map the player has seen, and masks hiding the rest"""
+
+import math
+
+import pygame
+
+from .config import TILE_SIZE, FOV, MAX_DEPTH, BLACK, np
+
+
+FOG_KEY = (255, 0, 255)  # Color key of fog masks: explored pixels are see-through
+
+
+class Exploration:
+    """One bit per tile, set once the player has seen the tile
+
+    Each row is padded to whole bytes (bit x % 8 of byte x // 8, least significant
+    first), so the bits of a rectangle are sliced out row by row without shifting.
+    Reveals only write the bits that change and return those tiles, so callers update
+    their masks for the newly seen tiles alone.
+    """
+    def __init__(self, width, height, data=None):
+        self.width = width
+        self.height = height
+        self.stride = (width + 7) // 8  # Bytes per row
+        self.data = bytearray(data) if data is not None else bytearray(self.stride * height)
+
+    def buffer(self):
+        """Zero-copy buffer for file I/O"""
+        return memoryview(self.data)
+
+    def is_explored(self, x, y):
+        return self.data[y * self.stride + (x >> 3)] >> (x & 7) & 1 == 1
+
+    def count(self):
+        """Number of explored tiles"""
+        return bin(int.from_bytes(self.data, "little")).count("1")
+
+    def reveal(self, tiles):
+        """Mark in-bounds (x, y) tiles explored; returns the ones not explored before"""
+        data, stride = self.data, self.stride
+        fresh = []
+        for x, y in tiles:
+            index = y * stride + (x >> 3)
+            bit = 1 << (x & 7)
+            if not data[index] & bit:
+                data[index] |= bit
+                fresh.append((x, y))
+        return fresh
+
+    def reveal_disc(self, center_x, center_y, radius):
+        """Reveal the tiles within radius tiles of a tile"""
+        tiles = []
+        for y in range(max(0, center_y - radius), min(self.height, center_y + radius + 1)):
+            half = math.isqrt(radius * radius - (y - center_y) ** 2)
+            tiles.extend((x, y) for x in range(max(0, center_x - half), min(self.width, center_x + half + 1)))
+        return self.reveal(tiles)
+
+    def reveal_segments(self, origin_x, origin_y, end_xs, end_ys):
+        """Reveal the tiles along lines of sight from a world pixel to each end point
+
+        Lines are sampled every half tile and carried a quarter tile past their end, so a
+        wall hit on its far side is revealed along with the tiles in front of it; sight is
+        cut off at MAX_DEPTH, keeping the cost independent of the map size. Rays closer
+        together than half a tile at MAX_DEPTH see the same tiles, so only enough of them
+        to keep that spacing are walked.
+        """
+        every = max(1, int(len(end_xs) * TILE_SIZE / (2 * FOV * MAX_DEPTH)))
+        end_xs, end_ys = end_xs[::every], end_ys[::every]
+        width, height = self.width, self.height
+        if np is not None:
+            dx = np.asarray(end_xs, dtype=float) - origin_x
+            dy = np.asarray(end_ys, dtype=float) - origin_y
+            length = np.hypot(dx, dy)
+            reach = np.minimum(length + TILE_SIZE/4, MAX_DEPTH)
+            stretch = reach / np.maximum(length, 1e-9)
+            samples = int(reach.max(initial=0) * 2 / TILE_SIZE) + 2
+            along = np.linspace(0, 1 / TILE_SIZE, samples)[:, None] * stretch
+            # Sample tiles as int32, computed in place: this runs every first-person frame
+            position = np.multiply(dx, along)
+            position += origin_x / TILE_SIZE
+            xs = np.floor(position, out=position).astype(np.int32).ravel()
+            np.multiply(dy, along, out=position)
+            position += origin_y / TILE_SIZE
+            ys = np.floor(position, out=position).astype(np.int32).ravel()
+            del along, position
+            inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+            xs, ys = xs[inside], ys[inside]
+            # Most samples fall on explored tiles; only the rest are deduplicated and revealed
+            bits = np.frombuffer(self.data, dtype=np.uint8)[ys * self.stride + (xs >> 3)] >> (xs & 7) & 1
+            cells = np.unique(ys[bits == 0] * width + xs[bits == 0])
+            return self.reveal(zip((cells % width).tolist(), (cells // width).tolist()))
+
+        lines = []
+        for end_x, end_y in zip(end_xs, end_ys):
+            dx, dy = end_x - origin_x, end_y - origin_y
+            length = math.hypot(dx, dy)
+            reach = min(length + TILE_SIZE/4, MAX_DEPTH)
+            lines.append((dx, dy, reach / max(length, 1e-9), reach))
+        samples = int(max((line[3] for line in lines), default=0) * 2 / TILE_SIZE) + 2
+        step = 1 / TILE_SIZE / (samples - 1)
+        tiles = set()
+        for dx, dy, stretch, _ in lines:
+            for i in range(samples):
+                # The points numpy.linspace gives, so both paths reveal the same tiles
+                along = (i * step if i < samples - 1 else 1 / TILE_SIZE) * stretch
+                x = math.floor(origin_x / TILE_SIZE + dx * along)
+                y = math.floor(origin_y / TILE_SIZE + dy * along)
+                if 0 <= x < width and 0 <= y < height:
+                    tiles.add((x, y))
+        return self.reveal(sorted(tiles))
+
+    def region_array(self, left, top, width, height):
+        """(height, width) bool NumPy array of the explored bits in a rectangle inside the grid"""
+        rows = np.frombuffer(self.data, dtype=np.uint8).reshape(self.height, self.stride)
+        bits = np.unpackbits(rows[top:top + height, left >> 3:(left + width + 7) >> 3], axis=1, bitorder="little")
+        return bits[:, left & 7:(left & 7) + width] != 0
+
+
+def pixel_starts(count, pixels_per_tile):
+    """First pixel of each tile (and one past the last) when tiles are pixels_per_tile wide
+
+    A pixel shows the last tile starting at or before it, so when tiles are narrower than
+    a pixel only some of them are shown.
+    """
+    return [math.ceil(i * pixels_per_tile) for i in range(count + 1)]
+
+
+class MinimapFog:
+    """Fog mask over a minimap, patched tile by tile as tiles are revealed"""
+    def __init__(self, exploration, size, pixels_per_tile):
+        self.exploration = exploration
+        self.starts_x = pixel_starts(exploration.width, pixels_per_tile)
+        self.starts_y = pixel_starts(exploration.height, pixels_per_tile)
+        self.mask = pygame.Surface((size, size))
+        self.mask.fill(FOG_KEY)  # Beyond the map the minimap is see-through
+        self.mask.fill(BLACK, (0, 0, self.starts_x[-1], self.starts_y[-1]))
+        self.mask.set_colorkey(FOG_KEY)
+        if np is not None:
+            # Each pixel takes the bit of the tile it shows
+            width, height = min(size, self.starts_x[-1]), min(size, self.starts_y[-1])
+            tile_x = np.searchsorted(self.starts_x, np.arange(width), side="right") - 1
+            tile_y = np.searchsorted(self.starts_y, np.arange(height), side="right") - 1
+            rows = np.frombuffer(exploration.data, dtype=np.uint8).reshape(exploration.height, exploration.stride)
+            explored = (rows[tile_y][:, tile_x >> 3] >> (tile_x & 7) & 1) != 0
+            pixels = pygame.surfarray.pixels2d(self.mask)
+            pixels[:width, :height][explored.T] = self.mask.map_rgb(FOG_KEY)
+            del pixels
+        else:
+            for y in range(exploration.height):
+                row = exploration.data[y * exploration.stride:(y + 1) * exploration.stride]
+                if any(row):
+                    self.tiles_revealed((x, y) for x in range(exploration.width) if row[x >> 3] >> (x & 7) & 1)
+
+    def tiles_revealed(self, tiles):
+        starts_x, starts_y = self.starts_x, self.starts_y
+        for x, y in tiles:
+            if starts_x[x] < starts_x[x + 1] and starts_y[y] < starts_y[y + 1]:
+                self.mask.fill(FOG_KEY, (starts_x[x], starts_y[y],
+                                         starts_x[x + 1] - starts_x[x], starts_y[y + 1] - starts_y[y]))
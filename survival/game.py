@@ -0,0 +1,503 @@
+"""Command line parsing and the game loop"""
+
+import argparse
+import asyncio
+import math
+import os
+import random
+import time
+
+import pygame
+
+from . import config
+from .config import (
+    INITIAL_WINDOW_WIDTH, INITIAL_WINDOW_HEIGHT, TILE_SIZE, RAY_ENGINE, VECTORIZED_NUM_RAYS,
+    SAVE_FILE, MAP_JOB_SLICE_MS, MEMORY_WARMUP_FRAMES, BLACK, YELLOW, np,
+)
+from .hud import Hud, ui_text_key, draw_ui_text
+from .player import Player
+from .camera import Camera
+from .generation import MapJob
+from .world import GameMap, ChunkedGameMap
+from .controls import (
+    InputRecording, SCENARIOS, poll_input, HELD_INPUTS, EVENT_MAP_READY, INPUT_UP, INPUT_DOWN, INPUT_LEFT,
+    INPUT_RIGHT, INPUT_ROTATE_LEFT, INPUT_ROTATE_RIGHT, PRESS_CLUSTERING, PRESS_REGENERATE,
+    PRESS_LOCK, PRESS_VIEW, PRESS_INVENTORY, PRESS_INSTRUCTIONS, PRESS_MINIMAP,
+)
+from .saves import SaveGame
+from .profiler import FrameProfiler, StartupTimer
+from .quality import QualityController
+from .benchmarks import (
+    benchmark_generation, benchmark_items, benchmark_topdown, benchmark_env, benchmark_navigation,
+    benchmark_suite, save_results, compare_results, SUITE_CASES,
+)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mystical Survival Game")
+    parser.add_argument("--benchmark", choices=["generation", "items", "topdown", "env", "navigation", "suite"],
+                        help="run a benchmark instead of the game")
+    parser.add_argument("--sizes", type=int, nargs="+", default=None,
+                        help="map sizes in tiles per side for --benchmark generation and topdown "
+                             "(default: 1000 4000) and suite (default: 64 256 1024)")
+    parser.add_argument("--backends", nargs="+", choices=["numpy", "python"], default=None,
+                        help="generation backends to benchmark (default: GENERATION_BACKEND)")
+    parser.add_argument("--counts", type=int, nargs="+", default=[100000, 300000],
+                        help="item counts for --benchmark items")
+    parser.add_argument("--envs", type=int, nargs="+", default=[1, 64, 256],
+                        help="numbers of worlds stepped together for --benchmark env")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="processes to spread the worlds over for --benchmark env (0 steps them in-process)")
+    parser.add_argument("--agents", type=int, nargs="+", default=[1000, 5000],
+                        help="agent counts for --benchmark navigation")
+    parser.add_argument("--densities", type=float, nargs="+", default=[0.02, 0.1, 0.5],
+                        help="items per tile for --benchmark suite")
+    parser.add_argument("--rays", type=int, nargs="+", default=[120, 400, 800],
+                        help="ray counts for --benchmark suite")
+    parser.add_argument("--cases", nargs="+", choices=SUITE_CASES, default=None,
+                        help="hot paths to time in --benchmark suite (default: all)")
+    parser.add_argument("--benchmark-out", metavar="FILE", help="save --benchmark suite results as JSON")
+    parser.add_argument("--baseline", metavar="FILE",
+                        help="compare --benchmark suite results with JSON saved by --benchmark-out")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="fraction a median latency may grow over the baseline before it counts as a regression")
+    parser.add_argument("--seed", type=int, default=None, help="seed for map generation")
+    parser.add_argument("--infinite", action="store_true", help="play in the chunked infinite world")
+    parser.add_argument("--map-size", type=int, nargs=2, metavar=("WIDTH", "HEIGHT"),
+                        help="bounded map size in tiles (default: fit the window)")
+    parser.add_argument("--headless", action="store_true",
+                        help="run on SDL's dummy video driver as fast as possible and print a report")
+    parser.add_argument("--ticks", type=int, default=None,
+                        help="number of ticks to simulate when headless (default: replay length or 600)")
+    parser.add_argument("--replay", metavar="FILE", help="drive the game from a recorded input file")
+    parser.add_argument("--record", metavar="FILE", help="record input to a file on exit")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS),
+                        help="drive the game from a built-in input script, as a replay would")
+    parser.add_argument("--no-render", action="store_true", help="skip drawing, simulate only")
+    parser.add_argument("--no-fog", action="store_true", help="show the whole map instead of only explored tiles")
+    parser.add_argument("--load", metavar="FILE", help="start from a saved game")
+    parser.add_argument("--sim-rate", type=int, default=60, help="simulation ticks per second")
+    parser.add_argument("--render-rate", type=int, default=60, help="frame rate cap, 0 for uncapped")
+    parser.add_argument("--max-catch-up", type=int, default=5,
+                        help="most simulation ticks run in one frame before falling behind real time")
+    parser.add_argument("--quality", default="auto",
+                        choices=["auto", "lowest", "low", "medium", "high", "ultra"],
+                        help="first-person quality preset, or auto to adapt to the frame budget")
+    parser.add_argument("--profile-out", metavar="FILE",
+                        help="write per-frame phase timings to FILE (.csv or .json) on exit")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="print the time taken to reach each startup milestone after the first frame")
+    parser.add_argument("--memory-profile", action="store_true",
+                        help="track allocations per frame phase and GC pauses (slows the game down)")
+    parser.add_argument("--memory-budget", type=int, metavar="BYTES",
+                        help="with --memory-profile, exit with status 1 if the p95 bytes allocated per frame "
+                             "after warm-up exceed BYTES")
+    # Unknown arguments are ignored so the browser build can pass its own
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+async def main(args=None, started=None):
+    """Run the game; started is the perf_counter reading taken when the entry point began"""
+    startup = StartupTimer(started)
+    startup.mark("imports")
+    if args is None:
+        args = parse_args([])
+
+    if args.headless or args.benchmark:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+    config.SIM_RATE = args.sim_rate
+    config.RENDER_RATE = args.render_rate
+    config.MAX_CATCH_UP_STEPS = args.max_catch_up
+    config.INFINITE_WORLD = args.infinite
+    config.MAP_SIZE = tuple(args.map_size) if args.map_size else None
+    config.FOG_OF_WAR = not args.no_fog
+
+    if args.benchmark == "generation":
+        benchmark_generation(args.sizes or [1000, 4000], args.backends or [config.GENERATION_BACKEND], args.seed)
+        pygame.quit()
+        return
+    if args.benchmark == "items":
+        benchmark_items(args.counts, args.seed)
+        pygame.quit()
+        return
+    if args.benchmark == "topdown":
+        benchmark_topdown(args.sizes or [1000, 4000], args.seed)
+        pygame.quit()
+        return
+    if args.benchmark == "env":
+        benchmark_env(args.envs, args.workers, args.seed)
+        pygame.quit()
+        return
+    if args.benchmark == "navigation":
+        benchmark_navigation(args.agents, args.seed)
+        pygame.quit()
+        return
+    if args.benchmark == "suite":
+        results = benchmark_suite(args.sizes or [64, 256, 1024], args.densities, args.rays, args.seed, args.cases)
+        pygame.quit()
+        if args.benchmark_out:
+            save_results(args.benchmark_out, results, args.seed if args.seed is not None else 0)
+        if args.baseline:
+            regressions = compare_results(results, args.baseline, args.threshold)
+            if regressions:
+                raise SystemExit(f"{len(regressions)} benchmarks regressed by more than {args.threshold:.0%}")
+        return
+
+    # A replay brings its own seed, world type and generation backend; otherwise pick a seed so
+    # the session can be recorded
+    replay = InputRecording.load(args.replay) if args.replay else None
+    if args.scenario:
+        seed = args.seed if args.seed is not None else 0
+        # Scripts use the backend every install has, so they play out the same with or without NumPy
+        replay = InputRecording.from_script(seed, SCENARIOS[args.scenario],
+                                            InputRecording.FLAG_INFINITE_WORLD if config.INFINITE_WORLD else 0,
+                                            config.SIM_RATE, config.MAP_SIZE, backend="python")
+    if replay is not None:
+        session_seed = replay.seed
+        config.INFINITE_WORLD = bool(replay.flags & InputRecording.FLAG_INFINITE_WORLD)
+        config.SIM_RATE = replay.sim_rate
+        config.MAP_SIZE = replay.map_size
+        if replay.backend == "numpy" and np is None:
+            raise SystemExit(f"{args.replay} was recorded with NumPy map generation; install NumPy to replay it")
+        if replay.backend is not None:
+            config.GENERATION_BACKEND = replay.backend
+    elif args.seed is not None:
+        session_seed = args.seed
+    else:
+        session_seed = random.getrandbits(32)
+    random.seed(session_seed)
+    recording = None
+    if args.record:
+        recording = InputRecording(session_seed,
+                                   InputRecording.FLAG_INFINITE_WORLD if config.INFINITE_WORLD else 0,
+                                   sim_rate=config.SIM_RATE, map_size=config.MAP_SIZE,
+                                   backend=config.GENERATION_BACKEND)
+
+    # Create game objects
+    window_width = INITIAL_WINDOW_WIDTH
+    window_height = INITIAL_WINDOW_HEIGHT
+    pygame.display.init()  # Fonts are initialized with the first text drawn; nothing else is used
+    screen = pygame.display.set_mode((window_width, window_height))
+    startup.mark("display")
+    player = Player(window_width // 2, window_height // 2)
+    camera = Camera(window_width, window_height)
+    if config.INFINITE_WORLD:
+        game_map = ChunkedGameMap(session_seed)
+    elif config.MAP_SIZE is not None:
+        game_map = GameMap(config.MAP_SIZE[0] * TILE_SIZE, config.MAP_SIZE[1] * TILE_SIZE, session_seed)
+    else:
+        game_map = GameMap(window_width, window_height, session_seed)
+    show_instructions = True  # Variable to track if instructions should be shown
+    show_minimap = True      # Variable to track if minimap should be shown
+
+    # Initial safe spawn
+    player.x, player.y = player.find_safe_spawn(game_map)
+
+    def save_game(path):
+        if config.INFINITE_WORLD:
+            print("Saving is only supported for the bounded map")
+            return
+        flags = ((SaveGame.FLAG_CLUSTERING if config.USE_CLUSTERING else 0)
+                 | (SaveGame.FLAG_MAP_LOCKED if config.MAP_LOCKED else 0))
+        try:
+            SaveGame.save(path, game_map, player, flags)
+        except OSError as error:
+            print(f"Could not save {path}: {error}")
+
+    def load_game(path):
+        nonlocal map_job, recording
+        if config.INFINITE_WORLD:
+            print("Loading is only supported for the bounded map")
+            return
+        try:
+            saved = SaveGame.load(path)
+        except (OSError, ValueError) as error:
+            print(f"Could not load {path}: {error}")
+            return
+        saved.apply(game_map, player)
+        map_job = None  # A map still generating would otherwise replace the loaded one when ready
+        if recording is not None:
+            # Recordings hold input, not save files, so a replay could not load the same world:
+            # keep the ticks before the load and record nothing after it
+            if len(recording):
+                recording.save(args.record)
+                print(f"Recording stopped by loading {path}; {args.record} holds the {len(recording)} ticks before it")
+            else:
+                print(f"Not recording to {args.record}: a replay cannot reproduce a loaded game")
+            recording = None
+        config.USE_CLUSTERING = bool(saved.flags & SaveGame.FLAG_CLUSTERING)
+        config.MAP_LOCKED = bool(saved.flags & SaveGame.FLAG_MAP_LOCKED)
+
+    map_job = None  # Map being generated in the background; the current map stays playable meanwhile
+
+    if args.load:
+        load_game(args.load)
+    startup.mark("world")
+
+    def regenerate_map():
+        nonlocal map_job
+        if config.INFINITE_WORLD:
+            # Chunks are generated lazily, so regenerating the streamed world is already cheap
+            game_map.generate_map()
+            player.x, player.y = player.find_safe_spawn(game_map)
+        else:
+            # A newer request replaces a pending one; a superseded thread finishes unobserved
+            map_job = MapJob(game_map.width, game_map.height, random.getrandbits(32), config.USE_CLUSTERING)
+            if replay is not None and replay.immediate_maps:
+                swap_in_map()
+
+    def swap_in_map():
+        nonlocal map_job
+        tiles, items = map_job.finish()
+        game_map.apply_generated(map_job.seed, tiles, items)
+        map_job = None
+        player.x, player.y = player.find_safe_spawn(game_map)
+
+    def apply_input(state, profiler):
+        """Advance the game by one tick of input"""
+        nonlocal show_instructions, show_minimap
+
+        if not config.MAP_LOCKED:
+            if state & PRESS_CLUSTERING:
+                config.USE_CLUSTERING = not config.USE_CLUSTERING
+                regenerate_map()
+            elif state & PRESS_REGENERATE:
+                regenerate_map()
+        # Swapping on a recorded tick keeps replays exact however long generation takes
+        if state & EVENT_MAP_READY and map_job is not None:
+            swap_in_map()
+        if state & PRESS_LOCK:
+            config.MAP_LOCKED = not config.MAP_LOCKED
+        if state & PRESS_VIEW:
+            player.view_mode = "first_person" if player.view_mode == "top_down" else "top_down"
+        if state & PRESS_INVENTORY:
+            player.inventory.visible = not player.inventory.visible
+        if state & PRESS_INSTRUCTIONS:
+            show_instructions = not show_instructions
+        if state & PRESS_MINIMAP:
+            show_minimap = not show_minimap
+        profiler.mark("events")
+
+        # Movement
+        dx = bool(state & INPUT_RIGHT) - bool(state & INPUT_LEFT)
+        dy = bool(state & INPUT_DOWN) - bool(state & INPUT_UP)
+
+        # Rotation (in first-person mode)
+        if player.view_mode == "first_person":
+            if state & INPUT_ROTATE_LEFT:
+                player.rotate(-1)
+            if state & INPUT_ROTATE_RIGHT:
+                player.rotate(1)
+
+        player.move(dx, dy, game_map)
+        game_map.update_streaming(player)
+        profiler.mark("move")
+
+        # Try to pick up items
+        player.try_pickup_items(game_map)
+        profiler.mark("pickup")
+
+    def interpolate_pose(previous, current, alpha):
+        """Pose a fraction alpha of the way between two ticks; jumps such as respawns are not blended"""
+        if abs(current[0] - previous[0]) > TILE_SIZE or abs(current[1] - previous[1]) > TILE_SIZE:
+            return current
+        turn = (current[2] - previous[2] + math.pi) % (2 * math.pi) - math.pi
+        return (previous[0] + (current[0] - previous[0]) * alpha,
+                previous[1] + (current[1] - previous[1]) * alpha,
+                (previous[2] + turn * alpha) % (2 * math.pi))
+
+    # Game loop
+    clock = pygame.time.Clock()
+    running = True
+    tick = 0
+    max_ticks = args.ticks
+    if max_ticks is None and args.headless:
+        max_ticks = len(replay) if replay is not None else 600
+    hud = Hud()
+    quality = QualityController(args.quality)
+    last_world_key = None
+    profiler = FrameProfiler(["events", "move", "pickup", "cast_rays", "draw_3d", "draw_map",
+                              "minimap", "inventory", "ui_text", "profiler", "present", "idle"])
+    memory = profiler.track_memory() if args.memory_profile or args.memory_budget is not None else None
+    start_time = time.perf_counter()
+    tick_seconds = 1 / config.SIM_RATE
+    accumulator = 0.0
+    last_time = start_time
+    pending_presses = 0  # Keys pressed on frames that ran no tick, applied on the next tick
+    previous_pose = (player.x, player.y, player.angle)
+
+    while running:
+        profiler.begin_frame()
+
+        # Live input is still polled during a replay so the window can be closed
+        live_state, quit_requested, other_keys = poll_input()
+        if quit_requested:
+            running = False
+        if map_job is not None:
+            map_job.advance(MAP_JOB_SLICE_MS)
+        for key in other_keys:
+            if key == pygame.K_F3:
+                profiler.visible = not profiler.visible
+            elif key == pygame.K_F4:
+                profiler.export(time.strftime("profile-%Y%m%d-%H%M%S.csv"))
+            elif key == pygame.K_t:
+                config.WALL_TEXTURES = not config.WALL_TEXTURES
+            elif key == pygame.K_f:
+                config.FOG_OF_WAR = not config.FOG_OF_WAR
+            elif key == pygame.K_F6:
+                quality.cycle_preset()
+            elif key == pygame.K_F5:
+                save_game(SAVE_FILE)
+            elif key == pygame.K_F9 and os.path.exists(SAVE_FILE):
+                load_game(SAVE_FILE)
+        profiler.mark("events")
+
+        # Real time is spent in fixed ticks; headless runs take one tick per frame, unthrottled
+        now = time.perf_counter()
+        if args.headless:
+            steps = 1
+        else:
+            accumulator += now - last_time
+            steps = int(accumulator / tick_seconds)
+            if steps > config.MAX_CATCH_UP_STEPS:
+                # Too far behind to catch up: drop the backlog so the game slows instead of stalling
+                steps = config.MAX_CATCH_UP_STEPS
+                accumulator = 0.0
+            else:
+                accumulator -= steps * tick_seconds
+        last_time = now
+
+        pending_presses |= live_state & ~HELD_INPUTS
+        for _ in range(steps):
+            state = (live_state & HELD_INPUTS) | pending_presses
+            pending_presses = 0
+            if replay is not None:
+                state = replay.states[tick] if tick < len(replay) else 0
+            elif map_job is not None and map_job.done():
+                state |= EVENT_MAP_READY
+            if recording is not None:
+                recording.append(state)
+
+            previous_pose = (player.x, player.y, player.angle)
+            apply_input(state, profiler)
+            tick += 1
+            if max_ticks is not None and tick >= max_ticks:
+                running = False
+                break
+
+        # Draw the player between the last two ticks; the simulated pose is restored after drawing
+        simulated_pose = (player.x, player.y, player.angle)
+        alpha = 1.0 if args.headless else accumulator / tick_seconds
+        player.x, player.y, player.angle = interpolate_pose(previous_pose, simulated_pose, alpha)
+
+        # Everything under the HUD depends only on this; when neither it nor a HUD layer
+        # changed, the previous frame is still on screen and nothing is drawn
+        world_key = (player.x, player.y, player.angle, player.view_mode, show_minimap,
+                     game_map.version, config.WALL_TEXTURES, config.FOG_OF_WAR, profiler.visible, quality.level)
+        inventory_key = tuple(player.inventory.items.items()) if player.inventory.visible else None
+        ui_key = ui_text_key(config.USE_CLUSTERING, config.MAP_LOCKED, player.view_mode, show_instructions)
+        status_key = "Generating map..." if map_job is not None else None
+        redraw = (world_key != last_world_key or profiler.visible or
+                  hud.changed("inventory", inventory_key) or hud.changed("instructions", ui_key) or
+                  hud.changed("status", status_key))
+
+        drew_first_person = False
+        if not args.no_render and redraw:
+            # Draw everything
+            screen.fill(BLACK)
+
+            if player.view_mode == "first_person":
+                view = quality.view_surface(screen)
+                if RAY_ENGINE == "vectorized":
+                    rays = player.cast_rays_vectorized(game_map, VECTORIZED_NUM_RAYS or quality.num_rays(view.get_width()))
+                else:
+                    rays = player.cast_rays(game_map, quality.num_rays(view.get_width()))
+                game_map.reveal_rays(player, rays)
+                profiler.mark("cast_rays")
+                player.draw_3d(view, rays, game_map)
+                quality.present(screen, view)
+                profiler.mark("draw_3d")
+                drew_first_person = True
+            else:
+                camera.follow(player, game_map)
+                game_map.reveal_around(player)
+                game_map.draw(screen, camera)
+                player.draw(screen, camera.offset())
+                profiler.mark("draw_map")
+
+            # Draw minimap if enabled
+            if show_minimap:
+                game_map.draw_minimap(screen, player)
+            profiler.mark("minimap")
+
+            # Draw inventory if visible
+            player.inventory.draw(screen, hud)
+            profiler.mark("inventory")
+
+            draw_ui_text(screen, hud, config.USE_CLUSTERING, config.MAP_LOCKED, player.view_mode, show_instructions)
+            profiler.mark("ui_text")
+
+            profiler.draw(screen)
+            hud.layer(screen, "status", status_key,
+                      lambda: [(hud.text(status_key, YELLOW), (10, screen.get_height() - 70))])
+            hud.layer(screen, "quality", (quality.name, quality.adaptive) if profiler.visible else None,
+                      lambda: [(hud.text(f"Quality: {quality.name}{' (auto)' if quality.adaptive else ''}"
+                                         " - F6 to change", YELLOW, 24), (10, screen.get_height() - 30))])
+            profiler.mark("profiler")
+
+            # Only the HUD changed: present just the rectangles it touched
+            dirty = hud.take_dirty()
+            if world_key == last_world_key and not profiler.visible:
+                pygame.display.update(dirty)
+            else:
+                pygame.display.flip()
+            last_world_key = world_key
+            profiler.mark("present")
+        player.x, player.y, player.angle = simulated_pose
+        await asyncio.sleep(0)  # Required for web browser
+        if not args.headless:
+            clock.tick(config.RENDER_RATE)
+        profiler.mark("idle")
+        profiler.end_frame()
+        if not startup.done("first_frame"):
+            startup.mark("first_frame")
+            if args.startup_report and not args.headless:
+                print(startup.report())
+        if drew_first_person:
+            quality.record((profiler.last_frame() - profiler.last_frame("idle")) / 1e6)
+
+    elapsed = time.perf_counter() - start_time
+    if recording is not None:
+        recording.save(args.record)
+    if args.profile_out:
+        profiler.export(args.profile_out)
+    if args.headless:
+        print(f"ticks: {tick} in {elapsed:.3f}s ({tick / elapsed:.1f} ticks/s)")
+        print(f"seed: {session_seed}")
+        print(f"player: x={player.x:.3f} y={player.y:.3f} angle={player.angle:.4f} view={player.view_mode}")
+        inventory = ", ".join(f"{item_type.value}={count}" for item_type, count in player.inventory.items.items())
+        print(f"inventory: {inventory or 'empty'}")
+        if game_map.bounded:
+            print(f"explored: {game_map.explored.count()}/{game_map.width * game_map.height} tiles")
+        print(f"quality: {quality.name}{' (auto)' if quality.adaptive else ''}")
+        print(startup.report())
+        for phase, (p50, p95, p99) in profiler.percentiles().items():
+            print(f"{phase}: p50={p50:.3f}ms p95={p95:.3f}ms p99={p99:.3f}ms")
+    over_budget = None
+    if memory is not None:
+        if args.headless:
+            print("\n".join(memory.report(MEMORY_WARMUP_FRAMES)))
+        if args.memory_budget is not None:
+            totals, _ = memory.frame_bytes(MEMORY_WARMUP_FRAMES)
+            totals.sort()
+            p95 = totals[min(len(totals) - 1, len(totals) * 95 // 100)] if totals else 0
+            if p95 > args.memory_budget:
+                over_budget = f"memory budget exceeded: p95 {p95}B per frame > {args.memory_budget}B"
+            else:
+                print(f"memory budget ok: p95 {p95}B per frame <= {args.memory_budget}B")
+        memory.stop()
+
+    pygame.quit()
+    if over_budget:
+        raise SystemExit(over_budget)
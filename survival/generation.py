@@ -0,0 +1,254 @@
+"""Map generation, the clearance field and background map jobs"""
+
+import random
+import threading
+import time
+
+from . import config
+from .config import (
+    TILE_SIZE, ITEM_SIZE, INITIAL_TREE_DENSITY, ITEM_SPAWN_CHANCE, FOREST_ITERATIONS, CLEARANCE_CAP, MAP_WORKER,
+    MAP_STEP_TILES, MAP_STEP_ITEMS, np,
+)
+from .tiles import TileGrid
+from .items import ITEM_TYPES, ItemStore
+
+
+def forest_rows(padded, top, bottom):
+    """Rows top to bottom of one clustering pass over a grid padded by one empty tile
+
+    Neighbor counts come from eight shifted views.
+    """
+    width = padded.shape[1] - 2
+    neighbors = np.zeros((bottom - top, width), dtype=np.uint8)
+    for dy in (0, 1, 2):
+        for dx in (0, 1, 2):
+            if dx != 1 or dy != 1:
+                neighbors += padded[top + dy:bottom + dy, dx:dx + width]
+    tiles = padded[top + 1:bottom + 1, 1:width + 1]
+    return np.where(tiles == 1, neighbors >= 3, neighbors >= 5).astype(np.uint8)
+
+
+def forest_step_array(tiles):
+    """Array version of forest_step"""
+    return forest_rows(np.pad(tiles, 1), 0, tiles.shape[0])
+
+
+def forest_step_bands(tiles, band):
+    """forest_step_array band rows at a time; a generator yielding after each band"""
+    padded = np.pad(tiles, 1)
+    new_tiles = np.empty_like(tiles)
+    for top in range(0, tiles.shape[0], band):
+        bottom = min(top + band, tiles.shape[0])
+        new_tiles[top:bottom] = forest_rows(padded, top, bottom)
+        yield
+    return new_tiles
+
+
+def forest_step(tiles):
+    """One clustering pass: trees survive with >= 3 tree neighbors, grow with >= 5
+
+    A generator like build_map: yields after each row and returns the new grid.
+    """
+    new_tiles = TileGrid(tiles.width, tiles.height)
+    for y in range(tiles.height):
+        for x in range(tiles.width):
+            neighbors = 0
+            for dy in (-1, 0, 1):
+                for dx in (-1, 0, 1):
+                    if (dx or dy) and tiles.get(x + dx, y + dy) == 1:
+                        neighbors += 1
+            if tiles.get_unchecked(x, y) == 1:
+                new_tiles.set_unchecked(x, y, 1 if neighbors >= 3 else 0)
+            else:
+                new_tiles.set_unchecked(x, y, 1 if neighbors >= 5 else 0)
+        yield
+    return new_tiles
+
+
+def add_items(type_codes, xs, ys):
+    """Fill a new ItemStore MAP_STEP_ITEMS items at a time; yields between them and returns the store"""
+    items = ItemStore()
+    for start in range(0, len(type_codes), MAP_STEP_ITEMS):
+        end = start + MAP_STEP_ITEMS
+        items.add_many(type_codes[start:end], xs[start:end], ys[start:end])
+        yield
+    return items
+
+
+def spawn_items(tiles, rng):
+    """Roll an item for every grass tile; yields after each row and returns an ItemStore"""
+    type_codes, xs, ys = [], [], []
+    item_codes = range(len(ITEM_TYPES))
+    offset = (TILE_SIZE - ITEM_SIZE) // 2
+    for y in range(tiles.height):
+        for x in range(tiles.width):
+            if tiles.get_unchecked(x, y) == 0 and rng.random() < ITEM_SPAWN_CHANCE:
+                type_codes.append(rng.choice(item_codes))
+                xs.append(x * TILE_SIZE + offset)
+                ys.append(y * TILE_SIZE + offset)
+        yield
+    return (yield from add_items(type_codes, xs, ys))
+
+
+def build_map(width, height, seed, clustering, backend=None):
+    """Generate the tiles and items for a map without touching any GameMap
+
+    A generator that yields between slices of work, so it can be run to completion,
+    on a worker thread, or a slice per frame; it returns (tiles, ItemStore). Slices are
+    a row (Python backend), MAP_STEP_TILES tiles (NumPy) or MAP_STEP_ITEMS items long.
+    """
+    if (backend or config.GENERATION_BACKEND) == "numpy":
+        # Array noise, neighbor counts and item rolls over bands of rows. Random numbers are
+        # drawn in the same order as for the whole grid at once, so a seed gives the same map
+        rng = np.random.default_rng(seed)
+        band = max(1, MAP_STEP_TILES // max(1, width))
+        tiles = np.empty((height, width), dtype=np.uint8)
+        for top in range(0, height, band):
+            tiles[top:top + band] = rng.random((min(band, height - top), width)) < INITIAL_TREE_DENSITY
+            yield
+        if clustering:
+            for _ in range(FOREST_ITERATIONS):
+                tiles = yield from forest_step_bands(tiles, band)
+        spawn_xs, spawn_ys = [], []
+        for top in range(0, height, band):
+            rows = tiles[top:top + band]
+            spawn_y, spawn_x = np.nonzero((rows == 0) & (rng.random(rows.shape) < ITEM_SPAWN_CHANCE))
+            spawn_xs.append(spawn_x)
+            spawn_ys.append(spawn_y + top)
+            yield
+        spawn_x = np.concatenate(spawn_xs) if spawn_xs else np.zeros(0, dtype=np.intp)
+        spawn_y = np.concatenate(spawn_ys) if spawn_ys else np.zeros(0, dtype=np.intp)
+        type_codes = rng.integers(0, len(ITEM_TYPES), size=len(spawn_x))
+        offset = (TILE_SIZE - ITEM_SIZE) // 2
+        items = yield from add_items(type_codes.tolist(), (spawn_x * TILE_SIZE + offset).tolist(),
+                                     (spawn_y * TILE_SIZE + offset).tolist())
+        return TileGrid.from_array(tiles), items
+
+    rng = random.Random(seed)
+    tiles = TileGrid(width, height)
+    for y in range(height):
+        tiles.row(y)[:] = bytes(1 if rng.random() < INITIAL_TREE_DENSITY else 0 for _ in range(width))
+        yield
+    items = yield from spawn_items(tiles, rng)
+    if clustering:
+        # Items are rolled again on the clustered forest, after the first roll used up its draws
+        for _ in range(FOREST_ITERATIONS):
+            tiles = yield from forest_step(tiles)
+        items = yield from spawn_items(tiles, rng)
+    return tiles, items
+
+
+def clearance_array(tiles):
+    """Chebyshev distance in tiles from every tile to the nearest tree, capped at CLEARANCE_CAP
+
+    Grows the tree mask one ring per pass; a tile's distance is the pass that first reaches it.
+    """
+    reached = tiles == 1
+    distance = np.full(tiles.shape, CLEARANCE_CAP, dtype=np.uint8)
+    for _ in range(CLEARANCE_CAP):
+        if not reached.any():
+            break
+        distance -= reached
+        # 3x3 dilation, done as a vertical then a horizontal pass
+        grown = reached.copy()
+        grown[1:] |= reached[:-1]
+        grown[:-1] |= reached[1:]
+        rows = grown.copy()
+        grown[:, 1:] |= rows[:, :-1]
+        grown[:, :-1] |= rows[:, 1:]
+        reached = grown
+    return distance
+
+
+def clearance_field(tiles):
+    """TileGrid of distances to the nearest tree (0 on trees); tiles off the grid count as open"""
+    if np is not None:
+        return TileGrid.from_array(clearance_array(tiles.as_array()))
+
+    # Breadth-first search outward from every tree at once
+    width, height = tiles.width, tiles.height
+    field = TileGrid(width, height, fill=CLEARANCE_CAP)
+    distances = field.data
+    frontier = [index for index, tile in enumerate(tiles.data) if tile == 1]
+    for index in frontier:
+        distances[index] = 0
+    for distance in range(1, CLEARANCE_CAP):
+        next_frontier = []
+        for index in frontier:
+            y, x = divmod(index, width)
+            for neighbor_y in range(max(0, y - 1), min(height, y + 2)):
+                for neighbor_x in range(max(0, x - 1), min(width, x + 2)):
+                    neighbor = neighbor_y * width + neighbor_x
+                    if distances[neighbor] > distance:
+                        distances[neighbor] = distance
+                        next_frontier.append(neighbor)
+        frontier = next_frontier
+    return field
+
+
+def nearest_open_tile(field, tile_x, tile_y, min_clearance):
+    """Tile of a clearance field closest to (tile_x, tile_y) with at least min_clearance, or None
+
+    Ties go to the first tile in row order.
+    """
+    if np is not None:
+        ys, xs = np.nonzero(field.as_array() >= min_clearance)
+        if not len(xs):
+            return None
+        best = np.argmin((xs - tile_x) ** 2 + (ys - tile_y) ** 2)
+        return int(xs[best]), int(ys[best])
+
+    best = None
+    for index, clearance in enumerate(field.data):
+        if clearance >= min_clearance:
+            y, x = divmod(index, field.width)
+            distance = (x - tile_x) ** 2 + (y - tile_y) ** 2
+            if best is None or distance < best[0]:
+                best = (distance, x, y)
+    return None if best is None else (best[1], best[2])
+
+
+def run_to_completion(steps):
+    """Drive a generator such as build_map to the end and return its result"""
+    while True:
+        try:
+            next(steps)
+        except StopIteration as done:
+            return done.value
+
+
+class MapJob:
+    """A map generated off the frame path, on a worker thread or in time slices"""
+    def __init__(self, width, height, seed, clustering, worker=MAP_WORKER):
+        self.seed = seed
+        self.steps = build_map(width, height, seed, clustering)
+        self.result = None
+        self.thread = None
+        if worker == "thread":
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def run(self):
+        self.result = run_to_completion(self.steps)
+
+    def advance(self, budget_ms):
+        """Run slices of a cooperative job until the budget is spent"""
+        if self.thread is not None or self.result is not None:
+            return
+        deadline = time.perf_counter() + budget_ms / 1000
+        try:
+            while time.perf_counter() < deadline:
+                next(self.steps)
+        except StopIteration as done:
+            self.result = done.value
+
+    def done(self):
+        return self.result is not None
+
+    def finish(self):
+        """Wait for the job, or run the rest of it now, and return (tiles, items)"""
+        if self.thread is not None:
+            self.thread.join()
+        elif self.result is None:
+            self.result = run_to_completion(self.steps)
+        return self.result
@@ -0,0 +1,84 @@
+"""Cached HUD text and layers presented with dirty rectangles"""
+
+from collections import OrderedDict
+
+import pygame
+
+from .config import TEXT_CACHE_SIZE, RED
+
+
+class Hud:
+    """Overlay layers drawn from cached fonts and text, recomposed only when their state changes
+
+    Each layer is a list of (surface, position) blits keyed on the state it shows. The
+    screen rectangles of layers that appeared, changed or disappeared are collected so the
+    loop can present them with pygame.display.update instead of a full flip.
+    """
+    def __init__(self):
+        self.fonts = {}
+        self.text_cache = OrderedDict()  # (message, color, size) -> surface, least recently used first
+        self.layers = {}  # name -> (key, blits, rect)
+        self.dirty = []
+
+    def font(self, size):
+        if size not in self.fonts:
+            if not pygame.font.get_init():
+                pygame.font.init()  # Deferred until the first text is drawn
+            self.fonts[size] = pygame.font.Font(None, size)
+        return self.fonts[size]
+
+    def text(self, message, color, size=36):
+        key = (message, color, size)
+        surface = self.text_cache.get(key)
+        if surface is None:
+            surface = self.text_cache[key] = self.font(size).render(message, True, color)
+            if len(self.text_cache) > TEXT_CACHE_SIZE:
+                self.text_cache.popitem(last=False)
+        else:
+            self.text_cache.move_to_end(key)
+        return surface
+
+    def changed(self, name, key):
+        entry = self.layers.get(name)
+        return (entry[0] if entry else None) != key
+
+    def layer(self, screen, name, key, compose):
+        """Blit a layer, calling compose() for its blits only when key changes; a None key hides it"""
+        entry = self.layers.get(name)
+        if entry is None or entry[0] != key:
+            blits = compose() if key is not None else []
+            rect = None
+            if blits:
+                rect = blits[0][0].get_rect(topleft=blits[0][1]).unionall(
+                    [surface.get_rect(topleft=position) for surface, position in blits[1:]])
+            self.dirty.extend(r for r in (entry[2] if entry else None, rect) if r is not None)
+            entry = self.layers[name] = (key, blits, rect)
+        if entry[1]:
+            screen.blits(entry[1], doreturn=False)
+
+    def take_dirty(self):
+        """Rectangles changed since the last call"""
+        dirty, self.dirty = self.dirty, []
+        return dirty
+
+
+def ui_text_key(use_clustering, map_locked, view_mode, show_instructions):
+    return (use_clustering, map_locked, view_mode) if show_instructions else None
+
+
+def draw_ui_text(screen, hud, use_clustering, map_locked, view_mode, show_instructions):
+    def compose():
+        mode = "Clustered" if use_clustering else "Random"
+        lock_status = "LOCKED" if map_locked else "UNLOCKED"
+        view_status = "First Person" if view_mode == "first_person" else "Top Down"
+
+        blits = [(hud.text(f"Mode: {mode}", RED), (10, 10)),
+                 (hud.text(f"Map: {lock_status} (L to lock, C to toggle, R to regenerate)", RED), (10, 50)),
+                 (hud.text(f"View: {view_status} (V to toggle, I for inventory)", RED), (10, 90))]
+        if view_mode == "first_person":
+            blits.append((hud.text("Use arrows/WASD to move, Q/E to rotate", RED), (10, 130)))
+        blits.append((hud.text("Press / to toggle instructions, M to toggle minimap", RED), (10, 170)))
+        return blits
+
+    hud.layer(screen, "instructions",
+              ui_text_key(use_clustering, map_locked, view_mode, show_instructions), compose)
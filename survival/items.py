@@ -0,0 +1,173 @@
+"""Item types, the struct-of-arrays item store and the player inventory"""
+
+from array import array
+from enum import Enum
+
+import pygame
+
+from .config import TILE_SIZE, ITEM_SIZE, WHITE, np
+
+
+class ItemType(Enum):
+    MUSHROOM = "Mushroom"
+    BERRY = "Berry"
+    STICK = "Stick"
+    STONE = "Stone"
+    FLOWER = "Flower"
+
+ITEM_COLORS = {
+    ItemType.MUSHROOM: (255, 235, 205),  # Light beige for mushrooms
+    ItemType.BERRY: (220, 20, 60),       # Crimson red for berries
+    ItemType.STICK: (205, 133, 63),      # Peru brown for sticks
+    ItemType.STONE: (169, 169, 169),     # Dark gray for stones
+    ItemType.FLOWER: (255, 105, 180)     # Hot pink for flowers
+}
+ITEM_TYPES = list(ItemType)  # Item type codes in the ItemStore and in saves index this list
+
+
+class ItemStore:
+    """Collectible items as parallel typed arrays instead of one object per item
+
+    Slot i holds an item's top-left corner (xs, ys), its type code (an index into
+    ITEM_TYPES) and an alive flag. Removed slots go on a free list and are reused by later
+    spawns, and live slots are indexed by the tile under the item's center for range queries.
+    """
+    def __init__(self):
+        self.xs = array('d')
+        self.ys = array('d')
+        self.types = array('B')
+        self.alive = bytearray()
+        self.free = []
+        self.cells = {}  # (tile_x, tile_y) -> live slots whose item center lies in that tile
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        """Live slots in slot order"""
+        if np is not None:
+            return iter(np.flatnonzero(np.frombuffer(self.alive, dtype=np.uint8)).tolist())
+        return (slot for slot, alive in enumerate(self.alive) if alive)
+
+    def cell(self, slot):
+        """Tile coordinates of the cell a slot is indexed under"""
+        return (int((self.xs[slot] + ITEM_SIZE/2) // TILE_SIZE),
+                int((self.ys[slot] + ITEM_SIZE/2) // TILE_SIZE))
+
+    def item_type(self, slot):
+        return ITEM_TYPES[self.types[slot]]
+
+    def add(self, type_code, x, y):
+        """Spawn one item, reusing a free slot if there is one; returns its slot"""
+        if self.free:
+            slot = self.free.pop()
+            self.xs[slot] = x
+            self.ys[slot] = y
+            self.types[slot] = type_code
+            self.alive[slot] = 1
+        else:
+            slot = len(self.alive)
+            self.xs.append(x)
+            self.ys.append(y)
+            self.types.append(type_code)
+            self.alive.append(1)
+        self.cells.setdefault(self.cell(slot), []).append(slot)
+        self.count += 1
+        return slot
+
+    def add_many(self, type_codes, xs, ys):
+        """Spawn a batch of items; free slots are filled first, then the arrays grow in bulk"""
+        reused = min(len(self.free), len(type_codes))
+        slots = [self.add(type_codes[i], xs[i], ys[i]) for i in range(reused)]
+        start = len(self.alive)
+        self.xs.extend(xs[reused:])
+        self.ys.extend(ys[reused:])
+        self.types.extend(type_codes[reused:])
+        self.alive += b"\x01" * (len(type_codes) - reused)
+        for slot in range(start, len(self.alive)):
+            self.cells.setdefault(self.cell(slot), []).append(slot)
+            slots.append(slot)
+        self.count += len(type_codes) - reused
+        return slots
+
+    def remove(self, slot):
+        """Free a slot; returns False if it was already free"""
+        if not self.alive[slot]:
+            return False
+        self.alive[slot] = 0
+        cell = self.cell(slot)
+        bucket = self.cells[cell]
+        bucket.remove(slot)
+        if not bucket:
+            del self.cells[cell]
+        self.free.append(slot)
+        self.count -= 1
+        return True
+
+    def remove_many(self, slots):
+        """Free a batch of slots; returns the ones that were live"""
+        return [slot for slot in slots if self.remove(slot)]
+
+    def in_rect(self, left, top, right, bottom):
+        """Live slots indexed in the tiles overlapping a pixel rectangle"""
+        tile_left, tile_right = int(left // TILE_SIZE), int(right // TILE_SIZE)
+        tile_top, tile_bottom = int(top // TILE_SIZE), int(bottom // TILE_SIZE)
+        if (tile_right - tile_left + 1) * (tile_bottom - tile_top + 1) > len(self.cells):
+            # Fewer occupied cells than tiles in the rectangle: scan the cells instead
+            return [slot for (tile_x, tile_y), bucket in self.cells.items()
+                    if tile_left <= tile_x <= tile_right and tile_top <= tile_y <= tile_bottom
+                    for slot in bucket]
+        return [slot
+                for tile_y in range(tile_top, tile_bottom + 1)
+                for tile_x in range(tile_left, tile_right + 1)
+                for slot in self.cells.get((tile_x, tile_y), ())]
+
+    def query(self, x, y, radius):
+        """Live slots whose item center lies within radius of (x, y)"""
+        half = ITEM_SIZE / 2
+        xs, ys = self.xs, self.ys
+        return [slot for slot in self.in_rect(x - radius, y - radius, x + radius, y + radius)
+                if (xs[slot] + half - x) ** 2 + (ys[slot] + half - y) ** 2 < radius * radius]
+
+    def arrays(self):
+        """Zero-copy NumPy views of (xs, ys, types, alive); drop them before the store grows"""
+        return (np.frombuffer(self.xs, dtype=np.float64), np.frombuffer(self.ys, dtype=np.float64),
+                np.frombuffer(self.types, dtype=np.uint8), np.frombuffer(self.alive, dtype=np.uint8))
+
+    def draw(self, screen, slots, offset=(0, 0)):
+        for slot in slots:
+            pygame.draw.rect(screen, ITEM_COLORS[ITEM_TYPES[self.types[slot]]],
+                             (self.xs[slot] + offset[0], self.ys[slot] + offset[1], ITEM_SIZE, ITEM_SIZE))
+
+
+class Inventory:
+    def __init__(self):
+        self.items = {}  # Dictionary to store item counts
+        self.visible = False
+
+    def add_item(self, item_type):
+        if item_type in self.items:
+            self.items[item_type] += 1
+        else:
+            self.items[item_type] = 1
+
+    def compose(self, hud):
+        # Draw inventory background
+        inventory_surface = pygame.Surface((300, 400))
+        inventory_surface.fill((50, 50, 50))
+        inventory_surface.set_alpha(230)
+
+        # Draw items list
+        y_offset = 10
+        for item_type, count in self.items.items():
+            text = f"{item_type.value}: {count}"
+            inventory_surface.blit(hud.text(text, WHITE, 32), (10, y_offset))
+            y_offset += 30
+
+        # Position inventory on screen
+        return [(inventory_surface, (10, 10))]
+
+    def draw(self, screen, hud):
+        key = tuple(self.items.items()) if self.visible else None
+        hud.layer(screen, "inventory", key, lambda: self.compose(hud))
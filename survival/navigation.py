@@ -0,0 +1,208 @@
+"""Tile navigation: a flow field toward one target shared by every entity, and cached A* routes"""
+
+import heapq
+from collections import OrderedDict, deque
+
+from .config import FLOW_FIELD_RADIUS, PATH_CACHE_SIZE, PATH_SEARCH_LIMIT
+
+
+# A tile's step is an index into STEPS, or NO_STEP where there is no move to make
+STEPS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+NO_STEP = 255
+
+
+class Navigator:
+    """Navigation over the walkable (non-tree) tiles of a bounded GameMap
+
+    The flow field stores, for every walkable tile within radius tiles of the target, the
+    BFS distance to the target and the neighbour to step to, so any number of entities
+    look up their next move in O(1). It is rebuilt only when the target moves to another
+    tile or a tree appears on a tile it routes through; a cleared tree can only shorten
+    routes, so it is patched in place. find_path answers one-off routes between any two
+    tiles with A*, caching results until a tile changes.
+    """
+    def __init__(self, game_map, radius=FLOW_FIELD_RADIUS, cache_size=PATH_CACHE_SIZE):
+        self.game_map = game_map
+        self.radius = radius
+        self.cache_size = cache_size
+        self.path_cache = OrderedDict()  # (start, goal) -> path tuple or None, least recently used first
+        self.rebuilds = 0
+        self.invalidate()
+
+    def invalidate(self):
+        """Forget the field and cached routes, e.g. after the whole map was replaced"""
+        self.target = None
+        self.left = self.top = self.width = self.height = 0
+        self.distances = []
+        self.steps = bytearray()
+        self.path_cache.clear()
+
+    def set_target(self, tile_x, tile_y):
+        """Point the field at a tile; nothing is recomputed while the target stays on it"""
+        if (tile_x, tile_y) != self.target:
+            self.target = (tile_x, tile_y)
+            self.rebuild()
+
+    def rebuild(self):
+        """Breadth-first search outward from the target over the window around it"""
+        self.rebuilds += 1
+        target_x, target_y = self.target
+        game_map = self.game_map
+        self.left = max(0, target_x - self.radius)
+        self.top = max(0, target_y - self.radius)
+        self.width = max(0, min(game_map.width, target_x + self.radius + 1) - self.left)
+        self.height = max(0, min(game_map.height, target_y + self.radius + 1) - self.top)
+        width = self.width
+        self.distances = distances = [-1] * (width * self.height)
+        self.steps = steps = bytearray([NO_STEP]) * (width * self.height)
+        if not game_map.in_bounds(target_x, target_y) or game_map.tiles.get_unchecked(target_x, target_y) == 1:
+            return
+
+        # Trees in the window as one flat byte string, row by row
+        blocked = b"".join(bytes(game_map.tiles.row(y)[self.left:self.left + width])
+                           for y in range(self.top, self.top + self.height))
+        start = (target_y - self.top) * width + (target_x - self.left)
+        distances[start] = 0
+        queue = deque([start])
+        last_column = width - 1
+        size = len(distances)
+        while queue:
+            index = queue.popleft()
+            distance = distances[index] + 1
+            column = index % width
+            # Each neighbour found from here steps back towards this tile
+            if column < last_column and distances[index + 1] < 0 and blocked[index + 1] != 1:
+                distances[index + 1] = distance
+                steps[index + 1] = 1
+                queue.append(index + 1)
+            if column > 0 and distances[index - 1] < 0 and blocked[index - 1] != 1:
+                distances[index - 1] = distance
+                steps[index - 1] = 0
+                queue.append(index - 1)
+            below = index + width
+            if below < size and distances[below] < 0 and blocked[below] != 1:
+                distances[below] = distance
+                steps[below] = 3
+                queue.append(below)
+            above = index - width
+            if above >= 0 and distances[above] < 0 and blocked[above] != 1:
+                distances[above] = distance
+                steps[above] = 2
+                queue.append(above)
+
+    def local_index(self, tile_x, tile_y):
+        x, y = tile_x - self.left, tile_y - self.top
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return y * self.width + x
+        return None
+
+    def next_step(self, tile_x, tile_y):
+        """(dx, dy) to the neighbouring tile one step closer to the target
+
+        (0, 0) on the target itself; None where the target cannot be reached within the field.
+        """
+        x, y = tile_x - self.left, tile_y - self.top
+        if 0 <= x < self.width and 0 <= y < self.height:
+            step = self.steps[y * self.width + x]
+            if step != NO_STEP:
+                return STEPS[step]
+            if (tile_x, tile_y) == self.target and self.distances[y * self.width + x] == 0:
+                return (0, 0)
+        return None
+
+    def distance(self, tile_x, tile_y):
+        """Steps from a tile to the target, or None if the field does not reach it"""
+        index = self.local_index(tile_x, tile_y)
+        if index is None or self.distances[index] < 0:
+            return None
+        return self.distances[index]
+
+    def tile_changed(self, tile_x, tile_y):
+        """Keep the field and cache in step with an edited tile; called by GameMap.set_tile"""
+        self.path_cache.clear()
+        if self.target is None:
+            return
+        index = self.local_index(tile_x, tile_y)
+        if index is None:
+            return
+        if self.game_map.tiles.get_unchecked(tile_x, tile_y) == 1:
+            # A new tree only matters if routes ran through it
+            if self.distances[index] >= 0:
+                self.rebuild()
+            return
+        if (tile_x, tile_y) == self.target:
+            self.rebuild()
+            return
+
+        # A cleared tile: join it to its nearest neighbour, then spread the shorter routes
+        best = None
+        for step, (dx, dy) in enumerate(STEPS):
+            neighbour = self.local_index(tile_x + dx, tile_y + dy)
+            if neighbour is not None and self.distances[neighbour] >= 0:
+                if best is None or self.distances[neighbour] < self.distances[best[0]]:
+                    best = (neighbour, step)
+        if best is None:
+            return
+        self.distances[index] = self.distances[best[0]] + 1
+        self.steps[index] = best[1]
+        queue = deque([(tile_x, tile_y)])
+        tiles = self.game_map.tiles
+        while queue:
+            x, y = queue.popleft()
+            distance = self.distances[self.local_index(x, y)] + 1
+            for step, (dx, dy) in enumerate(STEPS):
+                neighbour = self.local_index(x + dx, y + dy)
+                if (neighbour is not None and tiles.get_unchecked(x + dx, y + dy) != 1 and
+                        (self.distances[neighbour] < 0 or self.distances[neighbour] > distance)):
+                    self.distances[neighbour] = distance
+                    self.steps[neighbour] = step ^ 1  # Step back the way we came
+                    queue.append((x + dx, y + dy))
+
+    def find_path(self, start, goal, max_nodes=PATH_SEARCH_LIMIT):
+        """Tiles from start to goal inclusive by A*, or None if there is no route
+
+        Searches give up after expanding max_nodes tiles. Results are cached per
+        (start, goal) until a tile changes.
+        """
+        key = (start, goal)
+        if key in self.path_cache:
+            self.path_cache.move_to_end(key)
+            return self.path_cache[key]
+        path = self.search(start, goal, max_nodes)
+        self.path_cache[key] = path
+        if len(self.path_cache) > self.cache_size:
+            self.path_cache.popitem(last=False)
+        return path
+
+    def search(self, start, goal, max_nodes):
+        game_map = self.game_map
+        if game_map.is_tree(*goal) or not game_map.in_bounds(*goal) or not game_map.in_bounds(*start):
+            return None
+        goal_x, goal_y = goal
+        came_from = {start: None}
+        cost = {start: 0}
+        frontier = [(abs(start[0] - goal_x) + abs(start[1] - goal_y), 0, start)]
+        expanded = 0
+        while frontier:
+            _, steps, tile = heapq.heappop(frontier)
+            if tile == goal:
+                path = []
+                while tile is not None:
+                    path.append(tile)
+                    tile = came_from[tile]
+                return tuple(reversed(path))
+            if steps > cost[tile]:
+                continue  # A shorter route to this tile was queued after this entry
+            expanded += 1
+            if expanded > max_nodes:
+                return None
+            x, y = tile
+            for dx, dy in STEPS:
+                neighbour = (x + dx, y + dy)
+                if game_map.in_bounds(*neighbour) and not game_map.is_tree(*neighbour):
+                    if neighbour not in cost or steps + 1 < cost[neighbour]:
+                        cost[neighbour] = steps + 1
+                        came_from[neighbour] = tile
+                        estimate = steps + 1 + abs(neighbour[0] - goal_x) + abs(neighbour[1] - goal_y)
+                        heapq.heappush(frontier, (estimate, steps + 1, neighbour))
+        return None
@@ -0,0 +1,431 @@
+"""The player: movement, collision, pickup, ray casting and drawing"""
+
+import math
+
+import pygame
+
+from . import config
+from .config import (
+    TILE_SIZE, PLAYER_SIZE, ITEM_SIZE, FOV, NUM_RAYS, MAX_DEPTH, MIN_DISTANCE, MOVEMENT_SPEED,
+    ROTATION_SPEED, BASE_TICK_RATE, WHITE, YELLOW, SKY_BLUE, GROUND_GREEN, np,
+)
+from .items import ITEM_COLORS, Inventory
+from .render import Ray, RayBatch, ColumnRenderer
+
+
+class Player:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+        self.width = PLAYER_SIZE
+        self.height = PLAYER_SIZE
+        self.speed = MOVEMENT_SPEED * BASE_TICK_RATE / config.SIM_RATE
+        self.view_mode = "top_down"
+        self.angle = 0  # Facing angle in radians (0 is facing right)
+        self.rotation_speed = ROTATION_SPEED * BASE_TICK_RATE / config.SIM_RATE
+        self.inventory = Inventory()
+        self.pickup_range = TILE_SIZE  # Range for picking up items
+        self.column_renderer = ColumnRenderer() if np is not None else None
+
+        # Collision buffer zone drawn around the player for debugging
+        self.collision_buffer = 2
+        buffer_size = (self.width + self.collision_buffer * 2, self.height + self.collision_buffer * 2)
+        self.debug_surface = pygame.Surface(buffer_size, pygame.SRCALPHA)
+        self.debug_surface.fill((255, 0, 0, 128))  # Red with transparency
+
+    def rotate(self, direction):
+        self.angle += direction * self.rotation_speed
+        self.angle %= 2 * math.pi
+
+    def move(self, dx, dy, game_map):
+        if self.view_mode == "first_person":
+            # In first person, movement is relative to viewing angle
+            forward = -dy * self.speed  # Forward/backward
+            strafe = dx * self.speed    # Strafe left/right
+
+            # Calculate movement vector
+            move_x = math.cos(self.angle) * forward + math.cos(self.angle + math.pi/2) * strafe
+            move_y = math.sin(self.angle) * forward + math.sin(self.angle + math.pi/2) * strafe
+
+            # Try movement along both axes independently
+            self.try_move(move_x, 0, game_map)
+            self.try_move(0, move_y, game_map)
+        else:
+            # Top-down movement
+            self.try_move(dx * self.speed, dy * self.speed, game_map)
+
+    def try_move(self, dx, dy, game_map):
+        """Attempt to move by the given delta, checking for collisions"""
+        # Try moving horizontally
+        new_x = self.x + dx
+        if game_map.bounded:
+            new_x = max(0, min(new_x, game_map.pixel_width - self.width))
+        if not self.check_collision(new_x, self.y, game_map):
+            self.x = new_x
+
+        # Try moving vertically
+        new_y = self.y + dy
+        if game_map.bounded:
+            new_y = max(0, min(new_y, game_map.pixel_height - self.height))
+        if not self.check_collision(self.x, new_y, game_map):
+            self.y = new_y
+
+    def check_collision(self, x, y, game_map):
+        """Check if a position would result in a collision"""
+        # Broadphase: the player is smaller than a tile, so it can only overlap the tile under
+        # its center and that tile's neighbors; with no tree among them there is nothing to test
+        if game_map.clearance(int((x + self.width/2) // TILE_SIZE), int((y + self.height/2) // TILE_SIZE)) > 1:
+            return False
+
+        # Convert player bounds to tile coordinates
+        player_left = int(x // TILE_SIZE)
+        player_right = int((x + self.width) // TILE_SIZE)
+        player_top = int(y // TILE_SIZE)
+        player_bottom = int((y + self.height) // TILE_SIZE)
+
+        # Check tiles that the player overlaps
+        for tile_y in range(player_top, player_bottom + 1):
+            for tile_x in range(player_left, player_right + 1):
+                if game_map.is_tree(tile_x, tile_y):
+
+                    # Calculate exact distances to tile edges
+                    tile_left = tile_x * TILE_SIZE
+                    tile_right = (tile_x + 1) * TILE_SIZE
+                    tile_top = tile_y * TILE_SIZE
+                    tile_bottom = (tile_y + 1) * TILE_SIZE
+
+                    # Only collide if we're actually overlapping the tile
+                    if (x + self.width > tile_left and
+                        x < tile_right and
+                        y + self.height > tile_top and
+                        y < tile_bottom):
+                        return True
+        return False
+
+    def try_pickup_items(self, game_map):
+        """Pick up every item within range"""
+        items = game_map.items
+        picked = items.query(self.x + self.width/2, self.y + self.height/2, self.pickup_range)
+        for slot in picked:
+            self.inventory.add_item(items.item_type(slot))
+        game_map.remove_items(picked)
+
+    def find_safe_spawn(self, game_map):
+        """Find a safe spawn position without trees"""
+        center_x, center_y = game_map.spawn_point()
+
+        # Try center first
+        if not self.check_collision(center_x - self.width/2, center_y - self.height/2, game_map):
+            return center_x - self.width/2, center_y - self.height/2
+
+        # Otherwise the map knows its nearest open tile; stand in the middle of it
+        center_tile_x = center_x // TILE_SIZE
+        center_tile_y = center_y // TILE_SIZE
+        tile = game_map.open_tile_near(center_tile_x, center_tile_y)
+        if tile is not None:
+            return (tile[0] * TILE_SIZE + (TILE_SIZE - self.width) / 2,
+                    tile[1] * TILE_SIZE + (TILE_SIZE - self.height) / 2)
+
+        # If no safe spot found, clear an area and use center
+        for dy in [-1, 0, 1]:
+            for dx in [-1, 0, 1]:
+                if game_map.in_bounds(center_tile_x + dx, center_tile_y + dy):
+                    game_map.set_tile(center_tile_x + dx, center_tile_y + dy, 0)
+
+        return center_x - self.width/2, center_y - self.height/2
+
+    def cast_rays(self, game_map, num_rays=NUM_RAYS):
+        rays = []
+        start_angle = self.angle - FOV/2
+        angle_step = FOV / num_rays
+
+        for i in range(num_rays):
+            ray = Ray(start_angle + i * angle_step)
+
+            # Ray starting point (center of player)
+            ray_x = self.x + self.width/2
+            ray_y = self.y + self.height/2
+
+            # Ray direction vector
+            ray_cos = math.cos(ray.angle)
+            ray_sin = math.sin(ray.angle)
+
+            # DDA algorithm for ray casting
+            map_x = int(ray_x // TILE_SIZE)
+            map_y = int(ray_y // TILE_SIZE)
+
+            # Length of ray from current position to next x or y-side
+            delta_dist_x = abs(1 / ray_cos) if ray_cos != 0 else float('inf')
+            delta_dist_y = abs(1 / ray_sin) if ray_sin != 0 else float('inf')
+
+            # Calculate step and initial side_dist
+            if ray_cos < 0:
+                step_x = -1
+                side_dist_x = (ray_x - map_x * TILE_SIZE) / TILE_SIZE * delta_dist_x
+            else:
+                step_x = 1
+                side_dist_x = ((map_x + 1) * TILE_SIZE - ray_x) / TILE_SIZE * delta_dist_x
+
+            if ray_sin < 0:
+                step_y = -1
+                side_dist_y = (ray_y - map_y * TILE_SIZE) / TILE_SIZE * delta_dist_y
+            else:
+                step_y = 1
+                side_dist_y = ((map_y + 1) * TILE_SIZE - ray_y) / TILE_SIZE * delta_dist_y
+
+            # Perform DDA
+            hit = False
+            distance = 0
+            while not hit and distance < MAX_DEPTH:
+                # Jump to next map square
+                if side_dist_x < side_dist_y:
+                    side_dist_x += delta_dist_x
+                    map_x += step_x
+                    distance = side_dist_x
+                    side = 0
+                else:
+                    side_dist_y += delta_dist_y
+                    map_y += step_y
+                    distance = side_dist_y
+                    side = 1
+
+                # Check if ray has hit a wall
+                if game_map.in_bounds(map_x, map_y):
+                    if game_map.get_tile(map_x, map_y) == 1:
+                        hit = True
+                        ray.side = side
+                        ray.distance = max(MIN_DISTANCE, distance * TILE_SIZE)
+                        ray.hit_point = (ray_x + ray_cos * distance * TILE_SIZE,
+                                       ray_y + ray_sin * distance * TILE_SIZE)
+                else:
+                    break
+
+            if not hit:
+                ray.distance = MAX_DEPTH
+                ray.hit_point = (ray_x + ray_cos * MAX_DEPTH,
+                               ray_y + ray_sin * MAX_DEPTH)
+
+            # Fix fisheye effect
+            ray.distance *= math.cos(ray.angle - self.angle)
+            ray.distance = max(MIN_DISTANCE, ray.distance)
+
+            rays.append(ray)
+
+        return rays
+
+    def project_items(self, game_map, num_rays):
+        """Item billboards for a first-person frame, as (depth, first ray, last ray, slot), far to near
+
+        Each item within MAX_DEPTH is projected once: items behind the camera or outside
+        the field of view are culled, and the rest cover the rays passing within half an item
+        of their center. Depth is along the view direction, like the fisheye-corrected walls.
+        """
+        center_x = self.x + self.width/2
+        center_y = self.y + self.height/2
+        view_cos = math.cos(self.angle)
+        view_sin = math.sin(self.angle)
+        rays_per_radian = num_rays / FOV
+        items = game_map.items
+        if np is not None:
+            # The same projection over arrays of the candidate slots
+            slots = np.array(items.in_rect(center_x - MAX_DEPTH, center_y - MAX_DEPTH,
+                                           center_x + MAX_DEPTH, center_y + MAX_DEPTH), dtype=np.intp)
+            xs, ys, _, _ = items.arrays()
+            to_item_x = xs[slots] + ITEM_SIZE/2 - center_x
+            to_item_y = ys[slots] + ITEM_SIZE/2 - center_y
+            depth = to_item_x * view_cos + to_item_y * view_sin
+            lateral = to_item_y * view_cos - to_item_x * view_sin
+            distance = np.hypot(depth, lateral)
+            center_ray = (np.arctan2(lateral, depth) + FOV/2) * rays_per_radian
+            with np.errstate(divide='ignore'):
+                half_width = np.arctan(ITEM_SIZE/2 / distance) * rays_per_radian
+            first = np.maximum(0, np.ceil(center_ray - half_width)).astype(np.intp)
+            last = np.minimum(num_rays - 1, np.floor(center_ray + half_width)).astype(np.intp)
+            keep = np.flatnonzero((depth >= MIN_DISTANCE) & (distance < MAX_DEPTH) & (first <= last))
+            keep = keep[np.argsort(-depth[keep], kind='stable')]
+            return list(zip(depth[keep].tolist(), first[keep].tolist(), last[keep].tolist(),
+                            slots[keep].tolist()))
+
+        sprites = []
+        for slot in items.query(center_x, center_y, MAX_DEPTH):
+            to_item_x = items.xs[slot] + ITEM_SIZE/2 - center_x
+            to_item_y = items.ys[slot] + ITEM_SIZE/2 - center_y
+            depth = to_item_x * view_cos + to_item_y * view_sin
+            if depth < MIN_DISTANCE:
+                continue
+            lateral = to_item_y * view_cos - to_item_x * view_sin
+            distance = math.hypot(depth, lateral)
+            # Ray i points FOV/2 left of the view plus i * FOV / num_rays
+            center_ray = (math.atan2(lateral, depth) + FOV/2) * rays_per_radian
+            half_width = math.atan(ITEM_SIZE/2 / distance) * rays_per_radian
+            first = max(0, math.ceil(center_ray - half_width))
+            last = min(num_rays - 1, math.floor(center_ray + half_width))
+            if first <= last:
+                sprites.append((depth, first, last, slot))
+        sprites.sort(key=lambda sprite: sprite[0], reverse=True)
+        return sprites
+
+    def cast_rays_vectorized(self, game_map, num_rays):
+        """Cast all rays at once with NumPy, stepping them through the grid together"""
+        angles = self.angle - FOV/2 + np.arange(num_rays) * (FOV / num_rays)
+        ray_x = self.x + self.width/2
+        ray_y = self.y + self.height/2
+        ray_cos = np.cos(angles)
+        ray_sin = np.sin(angles)
+
+        # Same DDA setup as cast_rays, computed for every ray
+        start_x = int(ray_x // TILE_SIZE)
+        start_y = int(ray_y // TILE_SIZE)
+        step_x = np.where(ray_cos < 0, -1, 1)
+        step_y = np.where(ray_sin < 0, -1, 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            delta_dist_x = np.where(ray_cos != 0, np.abs(1 / ray_cos), np.inf)
+            delta_dist_y = np.where(ray_sin != 0, np.abs(1 / ray_sin), np.inf)
+            side_dist_x = np.where(ray_cos < 0,
+                                   (ray_x - start_x * TILE_SIZE) / TILE_SIZE * delta_dist_x,
+                                   ((start_x + 1) * TILE_SIZE - ray_x) / TILE_SIZE * delta_dist_x)
+            side_dist_y = np.where(ray_sin < 0,
+                                   (ray_y - start_y * TILE_SIZE) / TILE_SIZE * delta_dist_y,
+                                   ((start_y + 1) * TILE_SIZE - ray_y) / TILE_SIZE * delta_dist_y)
+
+        map_x = np.full(num_rays, start_x)
+        map_y = np.full(num_rays, start_y)
+        distance = np.zeros(num_rays)
+        side = np.zeros(num_rays, dtype=np.int8)
+        hit = np.zeros(num_rays, dtype=bool)
+        tiles, origin_x, origin_y = game_map.ray_grid()
+        grid_height, grid_width = tiles.shape
+
+        # Advance every unfinished ray by one grid step per iteration
+        active_idx = np.arange(num_rays)
+        while active_idx.size:
+            with np.errstate(invalid='ignore'):
+                on_x = side_dist_x[active_idx] < side_dist_y[active_idx]
+            step_x_idx = active_idx[on_x]
+            step_y_idx = active_idx[~on_x]
+
+            side_dist_x[step_x_idx] += delta_dist_x[step_x_idx]
+            map_x[step_x_idx] += step_x[step_x_idx]
+            distance[step_x_idx] = side_dist_x[step_x_idx]
+            side[step_x_idx] = 0
+
+            side_dist_y[step_y_idx] += delta_dist_y[step_y_idx]
+            map_y[step_y_idx] += step_y[step_y_idx]
+            distance[step_y_idx] = side_dist_y[step_y_idx]
+            side[step_y_idx] = 1
+
+            cell_x = map_x[active_idx]
+            cell_y = map_y[active_idx]
+            grid_x = cell_x - origin_x
+            grid_y = cell_y - origin_y
+            inside = ((grid_x >= 0) & (grid_x < grid_width) &
+                      (grid_y >= 0) & (grid_y < grid_height))
+            wall = np.zeros(active_idx.size, dtype=bool)
+            wall[inside] = tiles[grid_y[inside], grid_x[inside]] == 1
+            hit[active_idx[wall]] = True
+
+            # Rays stop on a wall, when leaving the map or past MAX_DEPTH
+            done = wall | ~inside | (distance[active_idx] >= MAX_DEPTH)
+            active_idx = active_idx[~done]
+
+        travel = np.where(hit, distance * TILE_SIZE, MAX_DEPTH)
+        distances = np.where(hit, np.maximum(MIN_DISTANCE, travel), MAX_DEPTH)
+        hit_x = ray_x + ray_cos * travel
+        hit_y = ray_y + ray_sin * travel
+        sides = np.where(hit, side, -1)
+
+        # Fix fisheye effect
+        fisheye = np.cos(angles - self.angle)
+        depths = np.maximum(MIN_DISTANCE, distances * fisheye)
+
+        return RayBatch(angles, distances, hit_x, hit_y, sides, depths)
+
+    def draw(self, screen, offset=(0, 0)):
+        if self.view_mode == "top_down":
+            x = self.x + offset[0]
+            y = self.y + offset[1]
+
+            # Draw player rectangle
+            pygame.draw.rect(screen, WHITE, (x, y, self.width, self.height))
+
+            # Draw collision buffer zone for debugging
+            screen.blit(self.debug_surface, (x - self.collision_buffer, y - self.collision_buffer))
+
+            # Calculate direction indicator points
+            tip_x = x + self.width/2 + math.cos(self.angle) * self.width
+            tip_y = y + self.height/2 + math.sin(self.angle) * self.height
+            left_x = x + self.width/2 + math.cos(self.angle - 2.6) * self.width * 0.7
+            left_y = y + self.height/2 + math.sin(self.angle - 2.6) * self.height * 0.7
+            right_x = x + self.width/2 + math.cos(self.angle + 2.6) * self.width * 0.7
+            right_y = y + self.height/2 + math.sin(self.angle + 2.6) * self.height * 0.7
+
+            # Draw direction triangle
+            pygame.draw.polygon(screen, YELLOW, [
+                (tip_x, tip_y),
+                (left_x, left_y),
+                (right_x, right_y)
+            ])
+
+    def draw_3d(self, screen, rays, game_map):
+        if self.column_renderer is not None and isinstance(rays, RayBatch):
+            self.column_renderer.draw(screen, self, rays, game_map)
+            return
+
+        # Clear screen with sky and ground
+        screen_width, screen_height = screen.get_size()
+        screen.fill(SKY_BLUE)
+        pygame.draw.rect(screen, GROUND_GREEN,
+                        (0, screen_height//2,
+                         screen_width, screen_height//2))
+
+        # Draw vertical strips for each ray
+        center_x = self.x + self.width/2
+        center_y = self.y + self.height/2
+        strip_width = max(1, screen_width // len(rays))
+        if isinstance(rays, RayBatch):
+            columns = rays.columns()
+        else:
+            columns = ((ray.angle, ray.distance) for ray in rays)
+        depths = []  # Wall depth per ray, for clipping item billboards
+        for i, (ray_angle, ray_distance) in enumerate(columns):
+            depths.append(ray_distance)
+            # Calculate wall height based on distance (increased height multiplier)
+            wall_height = min((TILE_SIZE * 1.5 * screen_height) / ray_distance, screen_height * 4)
+
+            # Calculate wall strip position (adjusted to make walls taller)
+            wall_top = (screen_height - wall_height) / 2
+            wall_bottom = (screen_height + wall_height) / 2
+
+            # Check if ray hit map boundary
+            ray_x = center_x + math.cos(ray_angle) * ray_distance
+            ray_y = center_y + math.sin(ray_angle) * ray_distance
+            is_boundary = not game_map.contains_point(ray_x, ray_y)
+
+            # Draw wall strip with distance shading
+            shade = max(0, min(255, 255 - ray_distance * 0.25))
+            if is_boundary:
+                # Use a more distinct color for boundaries (bright red)
+                wall_color = (min(255, shade * 2), 0, 0)  # Brighter red for boundaries
+            else:
+                wall_color = (shade, shade * 0.8, shade * 0.6)  # Normal brownish color
+
+            pygame.draw.rect(screen, wall_color,
+                           (i * strip_width, wall_top,
+                            strip_width + 1, wall_bottom - wall_top))
+
+        # Item billboards, far to near, drawn over runs of rays where they are in front of the wall
+        for depth, first, last, slot in self.project_items(game_map, len(depths)):
+            item_height = min((ITEM_SIZE * 1.5 * screen_height) / depth, screen_height * 2)
+            item_top = (screen_height - item_height) / 2
+            shade_factor = max(0.3, min(1.0, 1.0 - depth * 0.001))
+            item_color = tuple(int(c * shade_factor) for c in ITEM_COLORS[game_map.items.item_type(slot)])
+            run_start = None
+            for i in range(first, last + 2):
+                if i <= last and depths[i] > depth:
+                    if run_start is None:
+                        run_start = i
+                elif run_start is not None:
+                    pygame.draw.rect(screen, item_color,
+                                     (run_start * strip_width, item_top,
+                                      (i - run_start) * strip_width + 1, item_height))
+                    run_start = None
@@ -0,0 +1,287 @@
+"""Per-frame phase timing, opt-in memory tracking and startup milestones"""
+
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from array import array
+
+import pygame
+
+from .config import WHITE, GREEN, RED, YELLOW
+
+
+class FrameProfiler:
+    """Per-phase frame timings from perf_counter_ns, kept in fixed-size ring buffers
+
+    Each phase is timed from the previous mark, so marks must follow the loop in order.
+    """
+    def __init__(self, phases, history=3600, window=240):
+        self.phases = list(phases)
+        self.index = {phase: i for i, phase in enumerate(self.phases)}
+        self.history = history  # Frames kept for export
+        self.window = window    # Frames summarised in the overlay
+        self.samples = [array('q', [0]) * history for _ in self.phases]
+        self.totals = array('q', [0]) * history
+        self.current = array('q', [0]) * len(self.phases)  # Raw values: accumulating allocates no objects
+        self.frame = 0
+        self.last = 0
+        self.frame_start = 0
+        self.visible = False
+        self.font = None
+        self.memory = None  # MemoryProfiler fed by the same marks, when enabled
+        self._stats = None
+        self._stats_frame = -1
+
+    def track_memory(self):
+        """Start tracking allocations per phase (slows allocation down while enabled)"""
+        self.memory = MemoryProfiler(self.phases, self.history)
+        return self.memory
+
+    def begin_frame(self):
+        self.frame_start = self.last = time.perf_counter_ns()
+        if self.memory is not None:
+            self.memory.begin_frame()
+
+    def mark(self, phase):
+        """Charge the time since the previous mark to a phase"""
+        now = time.perf_counter_ns()
+        if self.memory is not None:
+            # Read memory before this bookkeeping allocates, and keep the reading's time out of every phase
+            self.memory.mark(phase)
+            self.current[self.index[phase]] += now - self.last
+            self.last = time.perf_counter_ns()
+            return
+        self.current[self.index[phase]] += now - self.last
+        self.last = now
+
+    def end_frame(self):
+        slot = self.frame % self.history
+        for i, elapsed in enumerate(self.current):
+            self.samples[i][slot] = elapsed
+            self.current[i] = 0
+        self.totals[slot] = self.last - self.frame_start
+        if self.memory is not None:
+            self.memory.end_frame(slot)
+        self.frame += 1
+
+    def last_frame(self, phase=None):
+        """Nanoseconds of the last finished frame, in total or for one phase"""
+        slot = (self.frame - 1) % self.history
+        return self.totals[slot] if phase is None else self.samples[self.index[phase]][slot]
+
+    def recent(self, values, count):
+        """The last count values of a ring buffer, oldest first"""
+        end = self.frame % self.history
+        if count <= end:
+            return values[end - count:end]
+        return values[self.history - (count - end):] + values[:end]
+
+    def percentiles(self):
+        """{phase: (p50, p95, p99)} in milliseconds over the recent window"""
+        count = min(self.frame, self.window)
+        stats = {}
+        for phase, values in [("frame", self.totals)] + list(zip(self.phases, self.samples)):
+            ordered = sorted(self.recent(values, count)) if count else [0]
+            stats[phase] = tuple(ordered[min(len(ordered) - 1, int(len(ordered) * q))] / 1e6
+                                 for q in (0.50, 0.95, 0.99))
+        return stats
+
+    def export(self, path):
+        """Write the retained per-frame samples (nanoseconds) as CSV, or JSON for .json paths"""
+        count = min(self.frame, self.history)
+        first = self.frame - count
+        totals = self.recent(self.totals, count)
+        columns = [self.recent(values, count) for values in self.samples]
+        # With memory tracking, GC pauses and per-phase allocations follow the timings
+        memory = self.memory
+        if memory is not None:
+            gc_collections = self.recent(memory.gc_collections, count)
+            gc_pauses = self.recent(memory.gc_pause, count)
+            phase_bytes = [self.recent(values, count) for values in memory.bytes]
+            phase_blocks = [self.recent(values, count) for values in memory.blocks]
+        if path.endswith(".json"):
+            frames = []
+            for i in range(count):
+                frame = {"frame": first + i, "total_ns": totals[i],
+                         "phases_ns": {phase: columns[p][i] for p, phase in enumerate(self.phases)}}
+                if memory is not None:
+                    frame["gc_collections"] = gc_collections[i]
+                    frame["gc_pause_ns"] = gc_pauses[i]
+                    frame["phases_bytes"] = {phase: phase_bytes[p][i] for p, phase in enumerate(self.phases)}
+                    frame["phases_blocks"] = {phase: phase_blocks[p][i] for p, phase in enumerate(self.phases)}
+                frames.append(frame)
+            with open(path, "w") as f:
+                json.dump({"phases": self.phases, "frames": frames}, f)
+        else:
+            header = ["frame", "total_ns"] + [f"{phase}_ns" for phase in self.phases]
+            if memory is not None:
+                columns += [gc_collections, gc_pauses] + phase_bytes + phase_blocks
+                header += (["gc_collections", "gc_pause_ns"] + [f"{phase}_bytes" for phase in self.phases] +
+                           [f"{phase}_blocks" for phase in self.phases])
+            with open(path, "w") as f:
+                f.write(",".join(header) + "\n")
+                for i in range(count):
+                    f.write(",".join(str(value) for value in [first + i, totals[i]] + [column[i] for column in columns]) + "\n")
+
+    def draw(self, screen):
+        if not self.visible:
+            return
+        if self.font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            self.font = pygame.font.Font(None, 20)
+        # Percentiles are re-sorted a few times a second rather than every frame
+        if self._stats is None or self.frame - self._stats_frame >= 15:
+            self._stats = self.percentiles()
+            self._stats_frame = self.frame
+
+        width = 300
+        height = 40 + 16 * len(self._stats) + 70
+        left = screen.get_width() - width - 10
+        top = screen.get_height() - height - 10
+        screen.fill((20, 20, 20), (left, top, width, height))
+        screen.blit(self.font.render("phase        p50     p95     p99 (ms)", True, WHITE), (left + 8, top + 6))
+        for row, (phase, (p50, p95, p99)) in enumerate(self._stats.items()):
+            text = f"{phase:<10} {p50:7.2f} {p95:7.2f} {p99:7.2f}"
+            screen.blit(self.font.render(text, True, YELLOW if phase == "frame" else WHITE),
+                        (left + 8, top + 24 + 16 * row))
+
+        # Frame-time graph of the recent window with the 60 fps budget line
+        graph_top = top + height - 64
+        graph_height = 56
+        count = min(self.frame, width - 16)
+        scale = graph_height / 33.3e6  # Graph spans 0-33 ms
+        budget_y = graph_top + graph_height - 16.7e6 * scale
+        pygame.draw.line(screen, RED, (left + 8, budget_y), (left + width - 8, budget_y))
+        if count > 1:
+            points = [(left + 8 + i, graph_top + graph_height - min(graph_height, total * scale))
+                      for i, total in enumerate(self.recent(self.totals, count))]
+            pygame.draw.lines(screen, GREEN, False, points)
+
+
+class MemoryProfiler:
+    """Allocations per frame phase from tracemalloc, and GC pauses from gc.callbacks
+
+    A phase's bytes are the traced peak above the level it started at: what it allocated on
+    top of what it inherited, short-lived temporaries included. Its blocks are the net change
+    in allocated memory blocks, so a phase that keeps growing shows up as a leak. Tracing
+    slows every allocation down, so frame times are only comparable between runs with the
+    same setting.
+    """
+    def __init__(self, phases, history=3600):
+        self.phases = list(phases)
+        self.index = {phase: i for i, phase in enumerate(self.phases)}
+        self.history = history
+        self.bytes = [array('q', [0]) * history for _ in self.phases]
+        self.blocks = [array('q', [0]) * history for _ in self.phases]
+        self.gc_collections = array('q', [0]) * history
+        self.gc_pause = array('q', [0]) * history  # Nanoseconds spent collecting during the frame
+        self.current_bytes = array('q', [0]) * len(self.phases)
+        self.current_blocks = array('q', [0]) * len(self.phases)
+        self.collections = 0
+        self.pause_ns = 0
+        self.frames = 0
+        self._gc_started = None
+        self.levels = array('q', [0, 0])  # Traced bytes and allocated blocks at the last reading
+        tracemalloc.start()
+        self.levels[1] = sys.getallocatedblocks()
+        gc.callbacks.append(self.on_gc)
+
+    def on_gc(self, phase, info):
+        if phase == "start":
+            self._gc_started = time.perf_counter_ns()
+        elif self._gc_started is not None:
+            self.pause_ns += time.perf_counter_ns() - self._gc_started
+            self.collections += 1
+            self._gc_started = None
+
+    def begin_frame(self):
+        # Blocks carry over from the last mark, so frees between frames count against the first phase
+        tracemalloc.reset_peak()
+        self.levels[0] = tracemalloc.get_traced_memory()[0]
+
+    def mark(self, phase):
+        current, peak = tracemalloc.get_traced_memory()
+        blocks = sys.getallocatedblocks()
+        i = self.index[phase]
+        self.current_bytes[i] += peak - self.levels[0]
+        self.current_blocks[i] += blocks - self.levels[1]
+        tracemalloc.reset_peak()
+        self.levels[0] = current
+        self.levels[1] = blocks
+
+    def end_frame(self, slot):
+        for i in range(len(self.phases)):
+            self.bytes[i][slot] = self.current_bytes[i]
+            self.blocks[i][slot] = self.current_blocks[i]
+            self.current_bytes[i] = self.current_blocks[i] = 0
+        self.gc_collections[slot] = self.collections
+        self.gc_pause[slot] = self.pause_ns
+        self.collections = self.pause_ns = 0
+        self.frames += 1
+
+    def frame_bytes(self, skip=0):
+        """Bytes allocated by each retained frame after the first skip, oldest first"""
+        count = min(self.frames, self.history) - skip
+        end = self.frames % self.history
+        slots = [(end - count + i) % self.history for i in range(max(0, count))]
+        return [sum(values[slot] for values in self.bytes) for slot in slots], slots
+
+    def report(self, skip=0):
+        """Lines summarising allocations per phase, GC pauses and where live memory sits"""
+        snapshot = tracemalloc.take_snapshot()  # Before the summary's own lists exist
+        totals, slots = self.frame_bytes(skip)
+        if not slots:
+            return ["memory: no frames recorded"]
+        ordered = sorted(totals)
+        lines = [f"memory: {len(slots)} frames, allocated per frame p50={ordered[len(ordered) // 2]}B "
+                 f"p95={ordered[min(len(ordered) - 1, len(ordered) * 95 // 100)]}B max={ordered[-1]}B"]
+        for i, phase in enumerate(self.phases):
+            phase_bytes = sum(self.bytes[i][slot] for slot in slots) / len(slots)
+            phase_blocks = sum(self.blocks[i][slot] for slot in slots) / len(slots)
+            if phase_bytes or phase_blocks:
+                lines.append(f"  {phase}: {phase_bytes:.0f}B/frame, net {phase_blocks:+.2f} blocks/frame")
+        collections = sum(self.gc_collections[slot] for slot in slots)
+        pauses = [self.gc_pause[slot] for slot in slots if self.gc_collections[slot]]
+        if pauses:
+            lines.append(f"gc: {collections} collections in {len(pauses)} frames, "
+                         f"pause total={sum(pauses) / 1e6:.3f}ms max={max(pauses) / 1e6:.3f}ms per frame")
+        else:
+            lines.append("gc: no collections")
+
+        # Live traced memory grouped by the game module that allocated it
+        package = os.path.dirname(os.path.abspath(__file__))
+        snapshot = snapshot.filter_traces([tracemalloc.Filter(True, os.path.join(package, "*"))])
+        for stat in snapshot.statistics("filename")[:8]:
+            module = os.path.basename(stat.traceback[0].filename)
+            lines.append(f"  live in {module}: {stat.size / 1024:.1f}KiB in {stat.count} blocks")
+        return lines
+
+    def stop(self):
+        gc.callbacks.remove(self.on_gc)
+        tracemalloc.stop()
+
+
+class StartupTimer:
+    """Milestones on the way to the first frame, timed from when the entry point started"""
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self.marks = []
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter()))
+
+    def done(self, name):
+        return any(mark == name for mark, _ in self.marks)
+
+    def report(self):
+        """One line: cumulative ms at each milestone, with the step since the previous one"""
+        parts = []
+        previous = self.started
+        for name, at in self.marks:
+            parts.append(f"{name}={(at - self.started) * 1000:.1f}ms (+{(at - previous) * 1000:.1f})")
+            previous = at
+        return "startup: " + " ".join(parts)
@@ -0,0 +1,90 @@
+"""Adaptive first-person render quality"""
+
+import pygame
+
+from .config import QUALITY_LEVELS, FRAME_BUDGET_MS, QUALITY_WINDOW
+
+
+class QualityController:
+    """First-person render scale and ray count, chosen from QUALITY_LEVELS
+
+    In adaptive mode the median work time of each window of rendered frames is compared
+    with the budget: well over it steps down a level, well under it steps up. A level that
+    was stepped down from is not retried until a hold-off expires, and the hold-off doubles
+    each time that level fails again, so quality settles instead of oscillating.
+    """
+    DOWNGRADE_RATIO = 1.1  # Step down when the median exceeds the budget by this factor
+    UPGRADE_RATIO = 0.6  # Step up only when the median leaves this much headroom
+    HOLD_OFF_FRAMES = 120  # First wait before retrying a level that was too slow
+
+    def __init__(self, preset="auto", budget_ms=FRAME_BUDGET_MS, window=QUALITY_WINDOW):
+        self.names = [name for name, _, _ in QUALITY_LEVELS]
+        self.budget_ms = budget_ms
+        self.window = window
+        self.samples = []
+        self.frames = 0
+        self.retry_at = {}  # level -> frame count after which it may be tried again
+        self.hold_off = {}  # level -> current hold-off in frames
+        self.view = None
+        self.set_preset(preset)
+
+    def set_preset(self, preset):
+        """Fix a named level, or hand control to the adaptive controller with 'auto'"""
+        self.adaptive = preset == "auto"
+        self.level = self.names.index("medium" if self.adaptive else preset)
+        self.samples.clear()
+
+    def cycle_preset(self):
+        """auto -> each fixed level from lowest -> auto"""
+        if self.adaptive:
+            self.set_preset(self.names[0])
+        elif self.level + 1 < len(self.names):
+            self.set_preset(self.names[self.level + 1])
+        else:
+            self.set_preset("auto")
+
+    @property
+    def name(self):
+        return self.names[self.level]
+
+    @property
+    def render_scale(self):
+        return QUALITY_LEVELS[self.level][1]
+
+    def num_rays(self, width):
+        return max(1, width // QUALITY_LEVELS[self.level][2])
+
+    def view_surface(self, screen):
+        """The surface to render the first-person view into at the current scale"""
+        if self.render_scale >= 1:
+            return screen
+        width, height = screen.get_size()
+        size = (max(1, int(width * self.render_scale)), max(1, int(height * self.render_scale)))
+        if self.view is None or self.view.get_size() != size:
+            self.view = pygame.Surface(size, 0, screen)
+        return self.view
+
+    def present(self, screen, view):
+        """Upscale a reduced-resolution view onto the screen"""
+        if view is not screen:
+            pygame.transform.scale(view, screen.get_size(), screen)
+
+    def record(self, frame_ms):
+        """Feed the work time of one rendered first-person frame"""
+        self.frames += 1
+        if not self.adaptive:
+            return
+        self.samples.append(frame_ms)
+        if len(self.samples) < self.window:
+            return
+        median = sorted(self.samples)[len(self.samples) // 2]
+        self.samples.clear()
+
+        if median > self.budget_ms * self.DOWNGRADE_RATIO and self.level > 0:
+            hold_off = self.hold_off.get(self.level, self.HOLD_OFF_FRAMES // 2) * 2
+            self.hold_off[self.level] = hold_off
+            self.retry_at[self.level] = self.frames + hold_off
+            self.level -= 1
+        elif (median < self.budget_ms * self.UPGRADE_RATIO and self.level + 1 < len(QUALITY_LEVELS)
+              and self.frames >= self.retry_at.get(self.level + 1, 0)):
+            self.level += 1
@@ -0,0 +1,147 @@
+"""Ray cast results and the NumPy first-person column renderer"""
+
+import pygame
+
+from . import config
+from .config import (
+    TILE_SIZE, ITEM_SIZE, MAX_DEPTH, TEXTURE_SIZE, SHADE_LEVELS, SKY_BLUE, GROUND_GREEN, np,
+)
+from .items import ITEM_COLORS
+
+
+class Ray:
+    def __init__(self, angle):
+        self.angle = angle
+        self.distance = MAX_DEPTH
+        self.hit_point = (0, 0)
+        self.side = None  # 0 for a vertical tile edge, 1 for a horizontal one
+
+
+class RayBatch:
+    """Result of a vectorized cast: one array entry per ray"""
+    def __init__(self, angles, distances, hit_x, hit_y, sides, depths):
+        self.angles = angles
+        self.distances = distances  # Distance to the wall hit, before fisheye correction
+        self.hit_x = hit_x
+        self.hit_y = hit_y
+        self.sides = sides  # 0/1 like Ray.side, -1 when nothing was hit
+        self.depths = depths  # Fisheye-corrected distance, same as Ray.distance
+
+    def __len__(self):
+        return len(self.angles)
+
+    def columns(self):
+        """Yield (angle, depth) per ray, like iterating Ray objects"""
+        return zip(self.angles.tolist(), self.depths.tolist())
+
+
+class ColumnRenderer:
+    """First-person walls and items written straight into the screen's pixels, one column per ray strip"""
+    def __init__(self):
+        self.size = None
+
+    def resize(self, screen):
+        """Rebuild everything that depends on the screen size or pixel format"""
+        width, height = screen.get_size()
+        self.size = (width, height)
+        self.rows = np.arange(height, dtype=np.int16)[:, None]
+        self.rows32 = self.rows.astype(np.int32)
+        self.textures = self.build_textures(screen)
+        # Per-pixel scratch buffers reused every frame, laid out (row, column) like the screen
+        self.offsets = np.empty((height, width), dtype=np.int16)
+        self.mask = np.empty((height, width), dtype=bool)
+        self.texel_index = np.empty((height, width), dtype=np.int32)
+        self.texels = np.empty((height, width), dtype=np.uint32)
+
+    def build_textures(self, screen):
+        """Bark texture pre-shaded at every shade level as (level, u, v) screen pixel values"""
+        rng = np.random.default_rng(0)
+        grain = 0.75 + 0.25 * rng.random(TEXTURE_SIZE)
+        grain = (grain + np.roll(grain, 1) + np.roll(grain, -1)) / 3
+        grain[[0, -1]] = 0.55  # Darker tile edges
+        texel_noise = 0.9 + 0.1 * rng.random((TEXTURE_SIZE, TEXTURE_SIZE))
+        texture = np.array([255, 204, 153]) * (grain[:, None] * texel_noise)[..., None]
+        levels = np.arange(SHADE_LEVELS) / (SHADE_LEVELS - 1)
+        shaded = (texture[None] * levels[:, None, None, None]).astype(np.uint8)
+        return pygame.surfarray.map_array(screen, shaded).astype(np.uint32)
+
+    def spans(self, height, sizes):
+        """Top row and row count of centred spans, truncated to whole pixels like pygame.Rect"""
+        top = (height - sizes) / 2
+        return (np.trunc(top).astype(np.int16),
+                np.trunc((height + sizes) / 2 - top).astype(np.uint16))
+
+    def span_mask(self, top, rows, columns):
+        """(row, column) mask of the pixels inside each column's span"""
+        offsets = self.offsets[:, :columns]
+        np.subtract(self.rows, top, out=offsets)
+        # Rows above the top wrap around to large unsigned values
+        return np.less(offsets.view(np.uint16), rows, out=self.mask[:, :columns])
+
+    def draw(self, screen, player, rays, game_map):
+        width, height = screen.get_size()
+        if self.size != (width, height):
+            self.resize(screen)
+
+        # Screen column -> ray, matching the strip layout of the per-rect renderer
+        num_rays = len(rays)
+        strip_width = max(1, width // num_rays)
+        columns = min(width, num_rays * strip_width + 1)
+        ray_index = np.minimum(np.arange(columns) // strip_width, num_rays - 1)
+        depths = rays.depths[ray_index]
+
+        # Per-column distance shading; map boundaries are drawn red
+        shade = np.clip(255 - depths * 0.25, 0, 255)
+        angles = rays.angles[ray_index]
+        boundary = ~game_map.contains_points(player.x + player.width/2 + np.cos(angles) * depths,
+                                             player.y + player.height/2 + np.sin(angles) * depths)
+        colors = np.stack([np.where(boundary, np.minimum(255, shade * 2), shade),
+                           np.where(boundary, 0, shade * 0.8),
+                           np.where(boundary, 0, shade * 0.6)], axis=-1).astype(np.uint8)
+        wall_pixels = pygame.surfarray.map_array(screen, colors).astype(np.uint32)
+
+        wall_height = np.minimum(TILE_SIZE * 1.5 * height / depths, height * 4)
+        wall_top, wall_rows = self.spans(height, wall_height)
+        if config.WALL_TEXTURES:
+            # Pre-shaded texture column at the hit offset along the tile face; untextured
+            # columns (boundaries and misses) get a column of their flat color instead
+            sides = rays.sides[ray_index]
+            face = np.where(sides == 0, rays.hit_y[ray_index], rays.hit_x[ray_index])
+            u = (np.mod(face, TILE_SIZE) * (TEXTURE_SIZE / TILE_SIZE)).astype(np.int32)
+            level = (shade * ((SHADE_LEVELS - 1) / 255)).astype(np.int32)
+            texture_columns = self.textures[level, u]
+            flat = (sides < 0) | boundary
+            texture_columns[flat] = wall_pixels[flat, None]
+
+            # Texel row per pixel in 16.16 fixed point, then offset into its column's texels
+            step = np.round(TEXTURE_SIZE * 65536 / wall_height).astype(np.int32)
+            start = np.round((wall_top - (height - wall_height) / 2) * step).astype(np.int32)
+            texel_index = self.texel_index[:, :columns]
+            np.multiply(self.rows32, step, out=texel_index)
+            texel_index += start - wall_top.astype(np.int32) * step
+            texel_index >>= 16
+            np.clip(texel_index, 0, TEXTURE_SIZE - 1, out=texel_index)
+            texel_index += np.arange(columns, dtype=np.int32) * TEXTURE_SIZE
+            wall_pixels = np.take(texture_columns.ravel(), texel_index, out=self.texels[:, :columns], mode='clip')
+
+        # Sky and ground are plain fills; columns are then written into a (row, column) view
+        # of the screen, which stays locked until the view is released
+        screen.fill(SKY_BLUE)
+        screen.fill(GROUND_GREEN, (0, height//2, width, height//2))
+        frame = pygame.surfarray.pixels2d(screen).T
+        np.copyto(frame[:, :columns], wall_pixels, where=self.span_mask(wall_top, wall_rows, columns))
+
+        # Item billboards, far to near, keeping only the columns in front of the wall
+        for depth, first, last, slot in player.project_items(game_map, num_rays):
+            start = first * strip_width
+            end = min(columns, (last + 1) * strip_width + 1)
+            visible = np.flatnonzero(depths[start:end] > depth)
+            if not visible.size:
+                continue
+            item_height = min(ITEM_SIZE * 1.5 * height / depth, height * 2)
+            top = int((height - item_height) / 2)
+            bottom = int((height + item_height) / 2)
+            shade_factor = max(0.3, min(1.0, 1.0 - depth * 0.001))
+            color = tuple(int(c * shade_factor) for c in ITEM_COLORS[game_map.items.item_type(slot)])
+            frame[max(0, top):min(height, bottom), visible + start] = screen.map_rgb(color)
+        del frame
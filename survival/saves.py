@@ -0,0 +1,118 @@
+"""Saved games in a versioned, memory-mapped binary format"""
+
+import os
+import struct
+
+try:
+    import mmap
+except ImportError:  # Not every platform (e.g. some browser builds) has mmap; saves are then read into memory
+    mmap = None
+
+from .tiles import TileGrid
+from .items import ITEM_TYPES, ItemStore
+from .fog import Exploration
+
+
+class SaveGame:
+    """World and player state saved to a versioned binary file
+
+    File layout (little-endian): magic b"MSGW", uint16 version, uint64 seed, uint8 flags,
+    uint32 width and height, float64 player x, y and angle, uint8 view mode, uint32 item
+    count, uint16 inventory entry count; then width * height raw tile bytes, then the
+    explored-tile bitset (height rows of (width + 7) // 8 bytes, as Exploration stores
+    it), then (uint8 item type, float64 x, float64 y) item records and (uint8 item type,
+    uint32 count) inventory records. Tiles are memory-mapped on load, not parsed.
+    Version 1 files have no bitset; they load with nothing explored.
+    """
+    MAGIC = b"MSGW"
+    VERSION = 2
+    HEADER = struct.Struct("<4sHQBIIdddBIH")
+    ITEM = struct.Struct("<Bdd")
+    INVENTORY_ENTRY = struct.Struct("<BI")
+    FLAG_CLUSTERING = 1
+    FLAG_MAP_LOCKED = 2
+    VIEW_MODES = ["top_down", "first_person"]
+
+    def __init__(self, seed, flags, tiles, player_state, items, inventory, explored=None):
+        self.seed = seed
+        self.flags = flags
+        self.tiles = tiles
+        self.explored = explored  # Exploration, or None for a save from before fog of war
+        self.player_state = player_state  # (x, y, angle, view_mode)
+        self.items = items
+        self.inventory = inventory
+
+    @classmethod
+    def save(cls, path, game_map, player, flags=0):
+        """Write the game to path
+
+        The file is written next to path and then renamed over it, so the old file is never
+        truncated. Tiles of a game loaded from a save are still mapped from that file, and
+        some platforms refuse to replace a mapped file, so they are copied into memory first.
+        """
+        game_map.own_tiles()
+        item_index = {item_type: i for i, item_type in enumerate(ITEM_TYPES)}
+        items = game_map.items
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, game_map.seed, flags,
+                                    game_map.width, game_map.height,
+                                    player.x, player.y, player.angle,
+                                    cls.VIEW_MODES.index(player.view_mode),
+                                    len(game_map.items), len(player.inventory.items)))
+            f.write(game_map.tiles.buffer())
+            f.write(game_map.explored.buffer())
+            f.write(b"".join(cls.ITEM.pack(items.types[slot], items.xs[slot], items.ys[slot])
+                             for slot in items))
+            f.write(b"".join(cls.INVENTORY_ENTRY.pack(item_index[item_type], count)
+                             for item_type, count in player.inventory.items.items()))
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            if mmap is not None:
+                # Copy-on-write mapping: tile edits after loading never reach the file
+                data = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY))
+            else:
+                data = memoryview(bytearray(f.read()))
+        if len(data) < cls.HEADER.size:
+            raise ValueError(f"{path} is not a saved game")
+        (magic, version, seed, flags, width, height, x, y, angle, view_mode,
+         item_count, inventory_count) = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC:
+            raise ValueError(f"{path} is not a saved game")
+        if version not in (1, cls.VERSION):
+            raise ValueError(f"{path} has unsupported save version {version}")
+        if view_mode >= len(cls.VIEW_MODES):
+            raise ValueError(f"{path} has an unknown view mode")
+        explored_start = cls.HEADER.size + width * height
+        items_start = explored_start + (height * ((width + 7) // 8) if version >= 2 else 0)
+        inventory_start = items_start + item_count * cls.ITEM.size
+        end = inventory_start + inventory_count * cls.INVENTORY_ENTRY.size
+        if len(data) != end:
+            raise ValueError(f"{path} is truncated: expected {end} bytes, found {len(data)}")
+
+        tiles = TileGrid(width, height, data=data[cls.HEADER.size:explored_start])
+        explored = Exploration(width, height, data[explored_start:items_start]) if version >= 2 else None
+        items = ItemStore()
+        records = list(cls.ITEM.iter_unpack(data[items_start:inventory_start]))
+        if records:
+            type_codes, xs, ys = zip(*records)
+            if max(type_codes) >= len(ITEM_TYPES):
+                raise ValueError(f"{path} has an unknown item type")
+            items.add_many(type_codes, xs, ys)
+        entries = list(cls.INVENTORY_ENTRY.iter_unpack(data[inventory_start:end]))
+        if any(type_index >= len(ITEM_TYPES) for type_index, _ in entries):
+            raise ValueError(f"{path} has an unknown item type")
+        inventory = {ITEM_TYPES[type_index]: count for type_index, count in entries}
+        return cls(seed, flags, tiles, (x, y, angle, cls.VIEW_MODES[view_mode]), items, inventory, explored)
+
+    def apply(self, game_map, player):
+        game_map.seed = self.seed
+        game_map.set_tiles(self.tiles)
+        if self.explored is not None:
+            game_map.set_explored(self.explored)
+        game_map.set_items(self.items)
+        player.x, player.y, player.angle, player.view_mode = self.player_state
+        player.inventory.items = dict(self.inventory)
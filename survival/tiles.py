@@ -0,0 +1,70 @@
+"""Byte-per-tile grid storage"""
+
+from .config import np
+
+
+class TileGrid:
+    """Tiles stored one byte each in a row-major bytearray"""
+    def __init__(self, width, height, fill=0, data=None):
+        self.width = width
+        self.height = height
+        self.data = data if data is not None else bytearray([fill]) * (width * height)
+
+    @classmethod
+    def from_array(cls, array):
+        """Copy a 2D uint8 NumPy array into a new grid"""
+        height, width = array.shape
+        return cls(width, height, data=bytearray(array.astype(np.uint8, copy=False).tobytes()))
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def get(self, x, y, default=0):
+        """Bounds-checked read; positions outside the grid return default"""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.data[y * self.width + x]
+        return default
+
+    def get_unchecked(self, x, y):
+        return self.data[y * self.width + x]
+
+    def set(self, x, y, value):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise IndexError(f"tile ({x}, {y}) is outside a {self.width}x{self.height} grid")
+        self.data[y * self.width + x] = value
+
+    def set_unchecked(self, x, y, value):
+        self.data[y * self.width + x] = value
+
+    def fill(self, value, x=0, y=0, width=None, height=None):
+        """Set every tile in a rectangle, clipped to the grid, one row slice at a time"""
+        width = self.width - x if width is None else width
+        height = self.height - y if height is None else height
+        left, right = max(0, x), min(self.width, x + width)
+        if left >= right:
+            return
+        row_fill = bytes([value]) * (right - left)
+        for row_y in range(max(0, y), min(self.height, y + height)):
+            start = row_y * self.width
+            self.data[start + left:start + right] = row_fill
+
+    def row(self, y):
+        """Writable zero-copy view of one row"""
+        start = y * self.width
+        return memoryview(self.data)[start:start + self.width]
+
+    def region(self, x, y, width, height):
+        """Copy of a rectangle as a new grid; the rectangle must lie inside this one"""
+        data = bytearray()
+        for row_y in range(y, y + height):
+            start = row_y * self.width + x
+            data += self.data[start:start + width]
+        return TileGrid(width, height, data=data)
+
+    def buffer(self):
+        """Zero-copy buffer for NumPy, pygame or file I/O"""
+        return memoryview(self.data)
+
+    def as_array(self):
+        """Zero-copy (height, width) NumPy view; writes go straight to the grid"""
+        return np.frombuffer(self.data, dtype=np.uint8).reshape(self.height, self.width)
@@ -0,0 +1,758 @@
+"""The bounded map, the streamed chunked world and their minimaps"""
+
+import math
+import random
+from collections import OrderedDict
+
+import pygame
+
+from . import config
+from .config import (
+    INITIAL_WINDOW_WIDTH, INITIAL_WINDOW_HEIGHT, TILE_SIZE, PLAYER_SIZE, ITEM_SIZE,
+    INITIAL_TREE_DENSITY, ITEM_SPAWN_CHANCE, FOREST_ITERATIONS, CHUNK_SIZE, CHUNK_VIEW_DISTANCE,
+    MAX_RESIDENT_CHUNKS, CLEARANCE_CAP, SPAWN_CLEARANCE, TERRAIN_BLOCK_SIZE, FOG_REVEAL_RADIUS, BLACK,
+    WHITE, GREEN, BROWN, YELLOW, np,
+)
+from .tiles import TileGrid
+from .items import ITEM_COLORS, ITEM_TYPES, ItemStore
+from .generation import build_map, clearance_field, nearest_open_tile, run_to_completion
+from .navigation import Navigator
+from .fog import Exploration, MinimapFog
+from .render import RayBatch
+
+
+def draw_minimap_image(screen, image, player, scale, origin_x=0, origin_y=0, fog=None):
+    """Blit a minimap image with the player marker, origin being the world pixel at its corner"""
+    size = image.get_width()
+
+    # Position the minimap in the top-right corner with some padding
+    padding = 10
+    left = screen.get_width() - size - padding
+    top = padding
+    screen.blit(image, (left, top))
+    if fog is not None:
+        screen.blit(fog, (left, top))
+
+    # Draw player on minimap
+    previous_clip = screen.get_clip()
+    screen.set_clip((left, top, size, size))
+    mini_player_x = left + (player.x - origin_x) * scale
+    mini_player_y = top + (player.y - origin_y) * scale
+    mini_player_size = PLAYER_SIZE * scale
+    pygame.draw.rect(screen, WHITE,
+                    (mini_player_x, mini_player_y, mini_player_size, mini_player_size))
+
+    # Draw player direction indicator
+    tip_x = mini_player_x + mini_player_size/2 + math.cos(player.angle) * mini_player_size
+    tip_y = mini_player_y + mini_player_size/2 + math.sin(player.angle) * mini_player_size
+    pygame.draw.line(screen, YELLOW,
+                    (mini_player_x + mini_player_size/2, mini_player_y + mini_player_size/2),
+                    (tip_x, tip_y), 2)
+    screen.set_clip(previous_clip)
+
+    # Add a border around the minimap
+    pygame.draw.rect(screen, WHITE, (left, top, size, size), 2)
+
+
+class Minimap:
+    """Cached minimap image of a GameMap, updated in place as items come and go"""
+    def __init__(self, game_map, size=200):
+        self.game_map = game_map
+        self.size = size
+        self.terrain = None  # Terrain only, used to restore pixels under collected items
+        self.image = None    # Terrain with items drawn on top
+        self.fog = None      # MinimapFog over the image; kept across tile edits
+        self.scale = 1
+
+    def invalidate(self):
+        self.terrain = None
+        self.image = None
+
+    def reset_fog(self):
+        """Drop the fog mask, e.g. when the map's exploration was replaced"""
+        self.fog = None
+
+    def tiles_revealed(self, tiles):
+        if self.fog is not None:
+            self.fog.tiles_revealed(tiles)
+
+    def build_terrain(self):
+        """Render the terrain, averaging tiles together when a pixel covers several"""
+        game_map = self.game_map
+        self.scale = min(self.size / (game_map.width * TILE_SIZE),
+                         self.size / (game_map.height * TILE_SIZE))
+        mini_tile_size = TILE_SIZE * self.scale
+        self.terrain = pygame.Surface((self.size, self.size))
+        self.terrain.fill(BLACK)
+
+        if mini_tile_size >= 1:
+            for y in range(game_map.height):
+                for x in range(game_map.width):
+                    mini_rect = (x * mini_tile_size, y * mini_tile_size, mini_tile_size, mini_tile_size)
+                    if game_map.tiles.get_unchecked(x, y) == 0:  # Grass
+                        pygame.draw.rect(self.terrain, GREEN, mini_rect)
+                    elif game_map.tiles.get_unchecked(x, y) == 1:  # Tree
+                        pygame.draw.rect(self.terrain, BROWN, mini_rect)
+            return
+
+        # Downsampled: each minimap pixel covers a block of tiles
+        mini_width = max(1, int(game_map.width * mini_tile_size))
+        mini_height = max(1, int(game_map.height * mini_tile_size))
+        if np is not None:
+            block = math.ceil(1 / mini_tile_size)
+            tiles = game_map.tile_array()
+            padded = np.zeros((math.ceil(game_map.height / block) * block,
+                               math.ceil(game_map.width / block) * block), dtype=np.float32)
+            padded[:game_map.height, :game_map.width] = tiles == 1
+            tree_fraction = padded.reshape(padded.shape[0] // block, block,
+                                           padded.shape[1] // block, block).mean(axis=(1, 3))
+            colors = (np.array(GREEN, dtype=np.float32) * (1 - tree_fraction[..., None]) +
+                      np.array(BROWN, dtype=np.float32) * tree_fraction[..., None])
+            blocks = pygame.surfarray.make_surface(colors.astype(np.uint8).transpose(1, 0, 2))
+            self.terrain.blit(pygame.transform.smoothscale(blocks, (mini_width, mini_height)), (0, 0))
+        else:
+            # Without NumPy, sample the tile under each minimap pixel
+            pixels = pygame.PixelArray(self.terrain)
+            for mini_y in range(mini_height):
+                tile_y = min(game_map.height - 1, int((mini_y + 0.5) / mini_tile_size))
+                row = game_map.tiles.row(tile_y)
+                for mini_x in range(mini_width):
+                    tile_x = min(game_map.width - 1, int((mini_x + 0.5) / mini_tile_size))
+                    pixels[mini_x, mini_y] = BROWN if row[tile_x] == 1 else GREEN
+            pixels.close()
+
+    def item_rect(self, slot):
+        # Keep items at least one pixel wide on downsampled minimaps
+        items = self.game_map.items
+        mini_item_size = max(1, ITEM_SIZE * self.scale)
+        return pygame.Rect(int(items.xs[slot] * self.scale), int(items.ys[slot] * self.scale),
+                           math.ceil(mini_item_size), math.ceil(mini_item_size))
+
+    def draw_item(self, slot):
+        pygame.draw.rect(self.image, ITEM_COLORS[self.game_map.items.item_type(slot)], self.item_rect(slot))
+
+    def draw_items(self):
+        """Draw every live item; with NumPy all items are written into the pixels at once"""
+        items = self.game_map.items
+        if np is None:
+            for slot in items:
+                self.draw_item(slot)
+            return
+        xs, ys, types, alive = items.arrays()
+        live = alive.view(bool)
+        left = (xs[live] * self.scale).astype(np.intp)
+        top = (ys[live] * self.scale).astype(np.intp)
+        palette = np.array([self.image.map_rgb(ITEM_COLORS[item_type]) for item_type in ITEM_TYPES],
+                           dtype=np.uint32)
+        colors = palette[types[live]]
+        size = math.ceil(max(1, ITEM_SIZE * self.scale))
+        pixels = pygame.surfarray.pixels2d(self.image)
+        width, height = pixels.shape
+        for dy in range(size):
+            for dx in range(size):
+                inside = (left + dx < width) & (top + dy < height)
+                pixels[left[inside] + dx, top[inside] + dy] = colors[inside]
+        del pixels
+
+    def rebuild(self):
+        self.build_terrain()
+        self.image = self.terrain.copy()
+        self.draw_items()
+
+    def items_removed(self, slots):
+        """Restore the terrain under collected items and redraw any items sharing those pixels
+
+        Called after the slots are freed but before they can be reused, so their positions still read back.
+        """
+        if self.image is None:
+            return
+        if len(slots) * 32 > len(self.game_map.items):
+            # Large batches are cheaper to redraw over the cached terrain in one pass
+            self.image = self.terrain.copy()
+            self.draw_items()
+            return
+        for slot in slots:
+            rect = self.item_rect(slot)
+            self.image.blit(self.terrain, rect, rect)
+            left, top = rect.left / self.scale - TILE_SIZE, rect.top / self.scale - TILE_SIZE
+            right, bottom = rect.right / self.scale + TILE_SIZE, rect.bottom / self.scale + TILE_SIZE
+            for other in self.game_map.items.in_rect(left, top, right, bottom):
+                if self.item_rect(other).colliderect(rect):
+                    self.draw_item(other)
+
+    def draw(self, screen, player):
+        if self.image is None:
+            self.rebuild()
+        fog = None
+        if config.FOG_OF_WAR:
+            if self.fog is None:
+                self.fog = MinimapFog(self.game_map.explored, self.size, TILE_SIZE * self.scale)
+            fog = self.fog.mask
+        draw_minimap_image(screen, self.image, player, self.scale, fog=fog)
+
+
+class GameMap:
+    bounded = True
+
+    def __init__(self, pixel_width, pixel_height, seed=None):
+        self.minimap = Minimap(self)
+        self.items = ItemStore()
+        self.version = 0  # Bumped on every change that affects how the map is drawn
+        self._navigator = None
+        self.update_size(pixel_width, pixel_height)
+        self.generate_map(seed)
+
+    def update_size(self, pixel_width, pixel_height):
+        """Set the area the player can move in; the grid covers the whole tiles inside it"""
+        self.pixel_width = pixel_width
+        self.pixel_height = pixel_height
+        self.width = pixel_width // TILE_SIZE
+        self.height = pixel_height // TILE_SIZE
+        self.set_tiles(TileGrid(self.width, self.height))
+
+    def set_tiles(self, tiles):
+        """Replace the whole grid, e.g. with tiles loaded from a save"""
+        if (tiles.width, tiles.height) != (self.width, self.height):
+            # A grid of another size (from a save) brings its own extent
+            self.pixel_width = tiles.width * TILE_SIZE
+            self.pixel_height = tiles.height * TILE_SIZE
+        self.width = tiles.width
+        self.height = tiles.height
+        self.tiles = tiles
+        self._tile_array = None
+        self._blocks = {}  # (block x, block y) -> pre-rendered terrain surface
+        self._spare_blocks = []  # Surfaces of evicted blocks, reused rather than reallocated
+        self._dirty_tiles = set()
+        self.set_explored(Exploration(self.width, self.height))
+        self._clearance = None
+        self._open_tiles = {}
+        if self._navigator is not None:
+            self._navigator.invalidate()
+        self.minimap.invalidate()
+        self.version += 1
+
+    def set_tile(self, x, y, value):
+        """Change a single tile, keeping cached copies of the map in sync"""
+        if self.tiles.get_unchecked(x, y) == value:
+            return
+        self.tiles.set_unchecked(x, y, value)
+        self._dirty_tiles.add((x, y))
+        if self._clearance is not None:
+            self.update_clearance(x, y)
+        if self._navigator is not None:
+            self._navigator.tile_changed(x, y)
+        self._open_tiles.clear()
+        self.minimap.invalidate()
+        self.version += 1
+
+    def set_explored(self, exploration):
+        """Replace the fog of war, e.g. with one loaded from a save"""
+        self.explored = exploration
+        self._reveal_center = None
+        self._drop_blocks()
+        self.minimap.reset_fog()
+
+    def reveal_around(self, player):
+        """Explore the tiles within FOG_REVEAL_RADIUS of the player (top-down view)"""
+        center = (int(player.x + player.width/2) // TILE_SIZE, int(player.y + player.height/2) // TILE_SIZE)
+        if center != self._reveal_center and self.in_bounds(*center):
+            self._reveal_center = center
+            self.tiles_revealed(self.explored.reveal_disc(center[0], center[1], FOG_REVEAL_RADIUS))
+
+    def reveal_rays(self, player, rays):
+        """Explore the tiles the player's rays passed through, up to and including what they hit"""
+        if isinstance(rays, RayBatch):
+            end_xs, end_ys = rays.hit_x, rays.hit_y
+        else:
+            end_xs = [ray.hit_point[0] for ray in rays]
+            end_ys = [ray.hit_point[1] for ray in rays]
+        self.tiles_revealed(self.explored.reveal_segments(player.x + player.width/2, player.y + player.height/2,
+                                                          end_xs, end_ys))
+
+    def tiles_revealed(self, tiles):
+        """Uncover newly explored tiles in the cached terrain blocks and the minimap"""
+        if self._blocks_fogged:
+            # Blocks not cached now are built from the bits when they come into view
+            blocks = self._blocks
+            self._dirty_tiles.update(tile for tile in tiles
+                                     if (tile[0] // TERRAIN_BLOCK_SIZE, tile[1] // TERRAIN_BLOCK_SIZE) in blocks)
+        self.minimap.tiles_revealed(tiles)
+
+    def _drop_blocks(self):
+        """Forget every pre-rendered block, keeping the surfaces for reuse"""
+        self._spare_blocks.extend(self._blocks.values())
+        self._blocks.clear()
+        self._dirty_tiles.clear()
+        self._blocks_fogged = config.FOG_OF_WAR  # Whether the cached blocks have unexplored tiles blacked out
+
+    def draw_tile(self, surface, x, y, origin_x=0, origin_y=0):
+        """Draw tile (x, y) onto a surface whose top-left corner is tile (origin_x, origin_y)"""
+        rect = ((x - origin_x) * TILE_SIZE, (y - origin_y) * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+        if self._blocks_fogged and not self.explored.is_explored(x, y):
+            pygame.draw.rect(surface, BLACK, rect)
+        elif self.tiles.get_unchecked(x, y) == 0:  # Grass
+            pygame.draw.rect(surface, GREEN, rect)
+        elif self.tiles.get_unchecked(x, y) == 1:  # Tree
+            pygame.draw.rect(surface, BROWN, rect)
+
+    def block_surface(self, block_x, block_y):
+        """Pre-rendered terrain for one block of tiles, built on first use
+
+        The block is drawn one pixel per tile and scaled up, which is several times
+        cheaper than drawing a rect per tile. Under fog of war unexplored tiles are black.
+        """
+        surface = self._blocks.get((block_x, block_y))
+        if surface is None:
+            left, top = block_x * TERRAIN_BLOCK_SIZE, block_y * TERRAIN_BLOCK_SIZE
+            width = min(TERRAIN_BLOCK_SIZE, self.width - left)
+            height = min(TERRAIN_BLOCK_SIZE, self.height - top)
+            tile_image = pygame.Surface((TERRAIN_BLOCK_SIZE, TERRAIN_BLOCK_SIZE))
+            tile_image.fill(BLACK)  # Blocks on the right and bottom edges overhang the grid
+            if np is not None:
+                tiles = self.tile_array()[top:top + height, left:left + width]
+                colors = np.where(tiles == 1, tile_image.map_rgb(BROWN), tile_image.map_rgb(GREEN))
+                if self._blocks_fogged:
+                    colors[~self.explored.region_array(left, top, width, height)] = tile_image.map_rgb(BLACK)
+                pygame.surfarray.pixels2d(tile_image)[:width, :height] = colors.T
+            else:
+                pixels = pygame.PixelArray(tile_image)
+                for y in range(height):
+                    row = self.tiles.row(top + y)
+                    for x in range(width):
+                        if self._blocks_fogged and not self.explored.is_explored(left + x, top + y):
+                            pixels[x, y] = BLACK
+                        else:
+                            pixels[x, y] = BROWN if row[left + x] == 1 else GREEN
+                pixels.close()
+            size = (TERRAIN_BLOCK_SIZE * TILE_SIZE, TERRAIN_BLOCK_SIZE * TILE_SIZE)
+            if self._spare_blocks:
+                surface = pygame.transform.scale(tile_image, size, self._spare_blocks.pop())
+            else:
+                surface = pygame.transform.scale(tile_image, size)
+            self._blocks[(block_x, block_y)] = surface
+        return surface
+
+    def own_tiles(self):
+        """Copy tiles memory-mapped from a save into memory, releasing the file
+
+        The grid keeps its contents and nothing cached is redrawn; only the zero-copy
+        array view of the old buffer is dropped.
+        """
+        if not isinstance(self.tiles.data, bytearray):
+            self.tiles.data = bytearray(self.tiles.data)
+            self._tile_array = None
+
+    def tile_array(self):
+        """Return the tiles as a NumPy array sharing memory with the grid"""
+        if self._tile_array is None:
+            self._tile_array = self.tiles.as_array()
+        return self._tile_array
+
+    def set_items(self, items):
+        """Replace every item with the contents of an ItemStore"""
+        self.items = items
+        self.minimap.invalidate()
+        self.version += 1
+
+    def remove_items(self, slots):
+        removed = self.items.remove_many(slots)
+        if removed:
+            self.minimap.items_removed(removed)
+            self.version += 1
+
+    def in_bounds(self, tile_x, tile_y):
+        return 0 <= tile_x < self.width and 0 <= tile_y < self.height
+
+    def get_tile(self, tile_x, tile_y):
+        return self.tiles.get_unchecked(tile_x, tile_y)
+
+    def is_tree(self, tile_x, tile_y):
+        """Collision query; tiles outside the map are open"""
+        return self.tiles.get(tile_x, tile_y) == 1
+
+    def clearance_grid(self):
+        """Distance to the nearest tree for every tile, built once per map and patched on edits"""
+        if self._clearance is None:
+            self._clearance = clearance_field(self.tiles)
+        return self._clearance
+
+    def clearance(self, tile_x, tile_y):
+        """Tiles to the nearest tree (0 on a tree), capped at CLEARANCE_CAP
+
+        Tiles off the map report 0 so callers fall back to exact checks next to the border.
+        """
+        return self.clearance_grid().get(tile_x, tile_y, 0)
+
+    def update_clearance(self, tile_x, tile_y):
+        """Recompute the field around one edited tile; only tiles within CLEARANCE_CAP can change"""
+        reach = 2 * CLEARANCE_CAP
+        left, top = max(0, tile_x - reach), max(0, tile_y - reach)
+        right, bottom = min(self.width, tile_x + reach + 1), min(self.height, tile_y + reach + 1)
+        local = clearance_field(self.tiles.region(left, top, right - left, bottom - top))
+        start = max(0, tile_x - CLEARANCE_CAP)
+        end = min(self.width, tile_x + CLEARANCE_CAP + 1)
+        for y in range(max(0, tile_y - CLEARANCE_CAP), min(self.height, tile_y + CLEARANCE_CAP + 1)):
+            self._clearance.row(y)[start:end] = local.row(y - top)[start - left:end - left]
+
+    def navigator(self):
+        """The map's shared Navigator, created on first use and kept in step with tile edits"""
+        if self._navigator is None:
+            self._navigator = Navigator(self)
+        return self._navigator
+
+    def open_tile_near(self, tile_x, tile_y):
+        """Nearest tile with SPAWN_CLEARANCE to spare, else the nearest grass tile, else None
+
+        Looked up once per map and position, then cached until a tile changes.
+        """
+        key = (tile_x, tile_y)
+        if key not in self._open_tiles:
+            field = self.clearance_grid()
+            tile = nearest_open_tile(field, tile_x, tile_y, SPAWN_CLEARANCE)
+            if tile is None:
+                tile = nearest_open_tile(field, tile_x, tile_y, 1)
+            self._open_tiles[key] = tile
+        return self._open_tiles[key]
+
+    def spawn_point(self):
+        """Pixel the player starts at: the middle of the map"""
+        return self.pixel_width // 2, self.pixel_height // 2
+
+    def contains_point(self, x, y):
+        return 0 < x < self.width * TILE_SIZE and 0 < y < self.height * TILE_SIZE
+
+    def contains_points(self, xs, ys):
+        """contains_point over NumPy arrays of coordinates"""
+        return (0 < xs) & (xs < self.width * TILE_SIZE) & (0 < ys) & (ys < self.height * TILE_SIZE)
+
+    def ray_grid(self):
+        """Tile array for the vectorized caster, with its tile origin"""
+        return self.tile_array(), 0, 0
+
+    def update_streaming(self, player):
+        """Finite maps are always fully resident"""
+
+    def apply_generated(self, seed, tiles, items):
+        """Swap in a generated map in one step"""
+        self.seed = seed
+        self.set_tiles(tiles)
+        self.set_items(items)
+
+    def generate_map(self, seed=None, backend=None):
+        if not config.MAP_LOCKED:
+            seed = seed if seed is not None else random.getrandbits(32)
+            tiles, items = run_to_completion(build_map(self.width, self.height, seed, config.USE_CLUSTERING, backend))
+            self.apply_generated(seed, tiles, items)
+
+    def draw_minimap(self, screen, player, minimap_size=200):
+        if self.minimap.size != minimap_size:
+            self.minimap = Minimap(self, minimap_size)
+        self.minimap.draw(screen, player)
+
+    def draw(self, screen, camera):
+        """Draw the terrain blocks and items inside the camera's view
+
+        Only blocks overlapping the screen are drawn; those within a block of it keep their
+        surfaces so walking back and forth does not rebuild them, and the rest are dropped,
+        so the cost follows the screen size rather than the map size.
+        """
+        # Bring cached blocks up to date with edited and revealed tiles; blocks built later read the grid
+        if self._blocks_fogged != config.FOG_OF_WAR:
+            self._drop_blocks()
+        for x, y in self._dirty_tiles:
+            block_x, block_y = x // TERRAIN_BLOCK_SIZE, y // TERRAIN_BLOCK_SIZE
+            surface = self._blocks.get((block_x, block_y))
+            if surface is not None:
+                self.draw_tile(surface, x, y, block_x * TERRAIN_BLOCK_SIZE, block_y * TERRAIN_BLOCK_SIZE)
+        self._dirty_tiles.clear()
+
+        offset_x, offset_y = camera.offset()
+        block_pixels = TERRAIN_BLOCK_SIZE * TILE_SIZE
+        left, top, right, bottom = camera.visible_tiles()
+        first_x, last_x = max(0, left // TERRAIN_BLOCK_SIZE), min(right - 1, self.width - 1) // TERRAIN_BLOCK_SIZE
+        first_y, last_y = max(0, top // TERRAIN_BLOCK_SIZE), min(bottom - 1, self.height - 1) // TERRAIN_BLOCK_SIZE
+        for block_y in range(first_y, last_y + 1):
+            for block_x in range(first_x, last_x + 1):
+                screen.blit(self.block_surface(block_x, block_y),
+                            (block_x * block_pixels + offset_x, block_y * block_pixels + offset_y))
+        for key in [key for key in self._blocks
+                    if not (first_x - 1 <= key[0] <= last_x + 1 and first_y - 1 <= key[1] <= last_y + 1)]:
+            self._spare_blocks.append(self._blocks.pop(key))
+
+        # Draw the items on screen, leaving out those lying on unexplored tiles
+        left, top, right, bottom = camera.visible_rect()
+        slots = self.items.in_rect(left - ITEM_SIZE, top - ITEM_SIZE, right, bottom)
+        if self._blocks_fogged:
+            items, explored = self.items, self.explored
+            slots = [slot for slot in slots
+                     if explored.is_explored(int(items.xs[slot] + ITEM_SIZE/2) // TILE_SIZE,
+                                          int(items.ys[slot] + ITEM_SIZE/2) // TILE_SIZE)]
+        self.items.draw(screen, slots, (offset_x, offset_y))
+
+
+class Chunk:
+    """A CHUNK_SIZE x CHUNK_SIZE block of tiles and the items lying on it"""
+    def __init__(self, chunk_x, chunk_y, tiles):
+        self.chunk_x = chunk_x
+        self.chunk_y = chunk_y
+        self.tiles = tiles
+        self.item_slots = []  # Slots in the world's ItemStore for items on this chunk
+        self.surface = None  # Pre-rendered terrain, kept only while on screen
+        self.dirty_tiles = set()
+
+
+class ChunkedGameMap:
+    """Unbounded world generated chunk by chunk from a seed and the chunk coordinates"""
+    bounded = False
+
+    def __init__(self, seed=None):
+        self.chunks = OrderedDict()  # (chunk_x, chunk_y) -> Chunk, least recently used first
+        self.center_chunk = (0, 0)
+        self.edits = {}  # (chunk_x, chunk_y) -> {(tile_x, tile_y): value} set after generation
+        self.collected = set()  # Tiles whose item has been picked up
+        self.items = ItemStore()  # Items of the resident chunks; evicted chunks free their slots
+        self.seed = seed if seed is not None else random.getrandbits(32)
+        self.clustering = config.USE_CLUSTERING
+        self._ray_grid = None
+        self._minimap = None
+        self.version = 0  # Bumped on every change that affects how the map is drawn
+
+    def generate_map(self, seed=None):
+        if not config.MAP_LOCKED:
+            self.seed = seed if seed is not None else random.getrandbits(32)
+            self.clustering = config.USE_CLUSTERING
+            self.chunks.clear()
+            self.edits.clear()
+            self.collected.clear()
+            self.items = ItemStore()
+            self.changed()
+
+    def changed(self):
+        """Drop caches built from the resident window"""
+        self._ray_grid = None
+        self._minimap = None
+        self.version += 1
+
+    def noise(self, tile_x, tile_y, salt):
+        """Value in [0, 1) that depends only on the seed and the tile, never on load order"""
+        h = (tile_x * 374761393 + tile_y * 668265263 + (self.seed + salt * 2654435769) * 2246822519) & 0xFFFFFFFF
+        h = ((h ^ (h >> 13)) * 1274126177) & 0xFFFFFFFF
+        return (h ^ (h >> 16)) / 4294967296
+
+    def generate_chunk(self, chunk_x, chunk_y):
+        # Clustering reads neighbours, so generate a margin that each pass eats one cell into
+        margin = FOREST_ITERATIONS if self.clustering else 0
+        size = CHUNK_SIZE + 2 * margin
+        left = chunk_x * CHUNK_SIZE - margin
+        top = chunk_y * CHUNK_SIZE - margin
+        grid = [[1 if self.noise(left + x, top + y, 0) < INITIAL_TREE_DENSITY else 0
+                 for x in range(size)] for y in range(size)]
+
+        for _ in range(margin):
+            new_grid = [row[:] for row in grid]
+            for y in range(1, size - 1):
+                above, row, below = grid[y - 1], grid[y], grid[y + 1]
+                for x in range(1, size - 1):
+                    neighbors = (above[x - 1] + above[x] + above[x + 1] +
+                                 row[x - 1] + row[x + 1] +
+                                 below[x - 1] + below[x] + below[x + 1])
+                    if row[x] == 1:
+                        new_grid[y][x] = 1 if neighbors >= 3 else 0
+                    else:
+                        new_grid[y][x] = 1 if neighbors >= 5 else 0
+            grid = new_grid
+
+        tiles = TileGrid(CHUNK_SIZE, CHUNK_SIZE,
+                         data=bytearray().join(bytes(row[margin:margin + CHUNK_SIZE])
+                                               for row in grid[margin:margin + CHUNK_SIZE]))
+        chunk = Chunk(chunk_x, chunk_y, tiles)
+
+        type_codes, xs, ys = [], [], []
+        for y in range(CHUNK_SIZE):
+            for x in range(CHUNK_SIZE):
+                tile_x = left + margin + x
+                tile_y = top + margin + y
+                if (tiles.get_unchecked(x, y) == 0 and (tile_x, tile_y) not in self.collected and
+                        self.noise(tile_x, tile_y, 1) < ITEM_SPAWN_CHANCE):
+                    type_codes.append(int(self.noise(tile_x, tile_y, 2) * len(ITEM_TYPES)))
+                    xs.append(tile_x * TILE_SIZE + (TILE_SIZE - ITEM_SIZE) // 2)
+                    ys.append(tile_y * TILE_SIZE + (TILE_SIZE - ITEM_SIZE) // 2)
+        chunk.item_slots = self.items.add_many(type_codes, xs, ys)
+
+        # Replay tile edits made before the chunk was last evicted
+        for (tile_x, tile_y), value in self.edits.get((chunk_x, chunk_y), {}).items():
+            tiles.set_unchecked(tile_x - chunk_x * CHUNK_SIZE, tile_y - chunk_y * CHUNK_SIZE, value)
+        return chunk
+
+    def chunk_at(self, chunk_x, chunk_y):
+        chunk = self.chunks.get((chunk_x, chunk_y))
+        if chunk is None:
+            chunk = self.generate_chunk(chunk_x, chunk_y)
+            self.chunks[(chunk_x, chunk_y)] = chunk
+            self.evict_chunks()
+        return chunk
+
+    def window_keys(self):
+        center_x, center_y = self.center_chunk
+        return [(chunk_x, chunk_y)
+                for chunk_y in range(center_y - CHUNK_VIEW_DISTANCE, center_y + CHUNK_VIEW_DISTANCE + 1)
+                for chunk_x in range(center_x - CHUNK_VIEW_DISTANCE, center_x + CHUNK_VIEW_DISTANCE + 1)]
+
+    def evict_chunks(self):
+        """Drop least recently used chunks outside the view window until under the cap"""
+        limit = max(MAX_RESIDENT_CHUNKS, (2 * CHUNK_VIEW_DISTANCE + 1) ** 2)
+        if len(self.chunks) <= limit:
+            return
+        center_x, center_y = self.center_chunk
+        for key in list(self.chunks):
+            if len(self.chunks) <= limit:
+                break
+            if (abs(key[0] - center_x) > CHUNK_VIEW_DISTANCE or
+                    abs(key[1] - center_y) > CHUNK_VIEW_DISTANCE):
+                self.items.remove_many(self.chunks.pop(key).item_slots)
+
+    def update_streaming(self, player):
+        """Keep the chunks around the player resident and mark them recently used"""
+        chunk_pixels = CHUNK_SIZE * TILE_SIZE
+        center = (int((player.x + player.width/2) // chunk_pixels),
+                  int((player.y + player.height/2) // chunk_pixels))
+        if center != self.center_chunk:
+            self.center_chunk = center
+            self.changed()
+        for key in self.window_keys():
+            self.chunk_at(*key)
+            self.chunks.move_to_end(key)
+
+    def reveal_around(self, player):
+        """The streamed world has no fog of war"""
+
+    def reveal_rays(self, player, rays):
+        """The streamed world has no fog of war"""
+
+    def in_bounds(self, tile_x, tile_y):
+        """Rays only travel through the resident window around the player"""
+        return (abs(tile_x // CHUNK_SIZE - self.center_chunk[0]) <= CHUNK_VIEW_DISTANCE and
+                abs(tile_y // CHUNK_SIZE - self.center_chunk[1]) <= CHUNK_VIEW_DISTANCE)
+
+    def get_tile(self, tile_x, tile_y):
+        chunk = self.chunk_at(tile_x // CHUNK_SIZE, tile_y // CHUNK_SIZE)
+        return chunk.tiles.get_unchecked(tile_x % CHUNK_SIZE, tile_y % CHUNK_SIZE)
+
+    def is_tree(self, tile_x, tile_y):
+        return self.get_tile(tile_x, tile_y) == 1
+
+    def set_tile(self, tile_x, tile_y, value):
+        chunk_key = (tile_x // CHUNK_SIZE, tile_y // CHUNK_SIZE)
+        chunk = self.chunk_at(*chunk_key)
+        if chunk.tiles.get_unchecked(tile_x % CHUNK_SIZE, tile_y % CHUNK_SIZE) == value:
+            return
+        chunk.tiles.set_unchecked(tile_x % CHUNK_SIZE, tile_y % CHUNK_SIZE, value)
+        self.edits.setdefault(chunk_key, {})[(tile_x, tile_y)] = value
+        chunk.dirty_tiles.add((tile_x, tile_y))
+        self.changed()
+
+    def clearance(self, tile_x, tile_y):
+        """Streamed chunks keep no clearance field, so every move gets the exact check"""
+        return 0
+
+    def open_tile_near(self, tile_x, tile_y):
+        """Nearest grass tile found by searching square rings outward, or None"""
+        for radius in range(1, CHUNK_SIZE * CHUNK_VIEW_DISTANCE):
+            ring = [(x, y)
+                    for y in range(tile_y - radius, tile_y + radius + 1)
+                    for x in range(tile_x - radius, tile_x + radius + 1)
+                    if max(abs(x - tile_x), abs(y - tile_y)) == radius and not self.is_tree(x, y)]
+            if ring:
+                return min(ring, key=lambda tile: (tile[0] - tile_x) ** 2 + (tile[1] - tile_y) ** 2)
+        return None
+
+    def spawn_point(self):
+        """Pixel the player starts at, where a window-sized bounded map would put them"""
+        return INITIAL_WINDOW_WIDTH // 2, INITIAL_WINDOW_HEIGHT // 2
+
+    def contains_point(self, x, y):
+        return True
+
+    def contains_points(self, xs, ys):
+        return np.ones(np.shape(xs), dtype=bool)
+
+    def remove_items(self, slots):
+        for slot in slots:
+            cell = self.items.cell(slot)
+            self.chunks[(cell[0] // CHUNK_SIZE, cell[1] // CHUNK_SIZE)].item_slots.remove(slot)
+            # Remember the pickup so the item stays gone if the chunk is regenerated
+            self.collected.add(cell)
+        if self.items.remove_many(slots):
+            self.changed()
+
+    def ray_grid(self):
+        """Stitch the resident window into arrays for the vectorized caster"""
+        if self._ray_grid is None:
+            span = (2 * CHUNK_VIEW_DISTANCE + 1) * CHUNK_SIZE
+            origin_x = (self.center_chunk[0] - CHUNK_VIEW_DISTANCE) * CHUNK_SIZE
+            origin_y = (self.center_chunk[1] - CHUNK_VIEW_DISTANCE) * CHUNK_SIZE
+            tiles = np.zeros((span, span), dtype=np.uint8)
+            for chunk_x, chunk_y in self.window_keys():
+                chunk = self.chunk_at(chunk_x, chunk_y)
+                left = chunk_x * CHUNK_SIZE - origin_x
+                top = chunk_y * CHUNK_SIZE - origin_y
+                tiles[top:top + CHUNK_SIZE, left:left + CHUNK_SIZE] = chunk.tiles.as_array()
+            self._ray_grid = (tiles, origin_x, origin_y)
+        return self._ray_grid
+
+    def chunk_surface(self, chunk):
+        if chunk.surface is None:
+            chunk.surface = pygame.Surface((CHUNK_SIZE * TILE_SIZE, CHUNK_SIZE * TILE_SIZE))
+            chunk.dirty_tiles = {(chunk.chunk_x * CHUNK_SIZE + x, chunk.chunk_y * CHUNK_SIZE + y)
+                                 for y in range(CHUNK_SIZE) for x in range(CHUNK_SIZE)}
+        for tile_x, tile_y in chunk.dirty_tiles:
+            local_x = tile_x - chunk.chunk_x * CHUNK_SIZE
+            local_y = tile_y - chunk.chunk_y * CHUNK_SIZE
+            rect = (local_x * TILE_SIZE, local_y * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+            pygame.draw.rect(chunk.surface, BROWN if chunk.tiles.get_unchecked(local_x, local_y) == 1 else GREEN, rect)
+        chunk.dirty_tiles.clear()
+        return chunk.surface
+
+    def draw(self, screen, camera):
+        offset_x, offset_y = camera.offset()
+        chunk_pixels = CHUNK_SIZE * TILE_SIZE
+        visible = set()
+        for chunk_y in range(-offset_y // chunk_pixels, (screen.get_height() - offset_y) // chunk_pixels + 1):
+            for chunk_x in range(-offset_x // chunk_pixels, (screen.get_width() - offset_x) // chunk_pixels + 1):
+                chunk = self.chunk_at(chunk_x, chunk_y)
+                visible.add(chunk)
+                screen.blit(self.chunk_surface(chunk),
+                            (chunk_x * chunk_pixels + offset_x, chunk_y * chunk_pixels + offset_y))
+        left, top, right, bottom = camera.visible_rect()
+        self.items.draw(screen, self.items.in_rect(left - ITEM_SIZE, top - ITEM_SIZE, right, bottom),
+                        (offset_x, offset_y))
+
+        # Only chunks on screen keep a pre-rendered surface
+        for chunk in self.chunks.values():
+            if chunk.surface is not None and chunk not in visible:
+                chunk.surface = None
+
+    def draw_minimap(self, screen, player, minimap_size=200):
+        """Minimap of the resident window around the player"""
+        span = (2 * CHUNK_VIEW_DISTANCE + 1) * CHUNK_SIZE
+        origin_x = (self.center_chunk[0] - CHUNK_VIEW_DISTANCE) * CHUNK_SIZE
+        origin_y = (self.center_chunk[1] - CHUNK_VIEW_DISTANCE) * CHUNK_SIZE
+        if self._minimap is None or self._minimap.get_width() != minimap_size:
+            # One pixel per tile, scaled up to the minimap size
+            tile_image = pygame.Surface((span, span))
+            pixels = pygame.PixelArray(tile_image)
+            for chunk_x, chunk_y in self.window_keys():
+                chunk = self.chunk_at(chunk_x, chunk_y)
+                left = chunk_x * CHUNK_SIZE - origin_x
+                top = chunk_y * CHUNK_SIZE - origin_y
+                for y in range(CHUNK_SIZE):
+                    for x, tile in enumerate(chunk.tiles.row(y)):
+                        pixels[left + x, top + y] = BROWN if tile == 1 else GREEN
+            for slot in self.items.in_rect(origin_x * TILE_SIZE, origin_y * TILE_SIZE,
+                                           (origin_x + span) * TILE_SIZE - 1, (origin_y + span) * TILE_SIZE - 1):
+                tile_x, tile_y = self.items.cell(slot)
+                pixels[tile_x - origin_x, tile_y - origin_y] = ITEM_COLORS[self.items.item_type(slot)]
+            pixels.close()
+            self._minimap = pygame.transform.scale(tile_image, (minimap_size, minimap_size))
+        draw_minimap_image(screen, self._minimap, player, minimap_size / (span * TILE_SIZE),
+                           origin_x * TILE_SIZE, origin_y * TILE_SIZE)
@@ -0,0 +1,26 @@
+import pytest
+
+from survival.controls import InputRecording, INPUT_UP, INPUT_LEFT
+
+
+def test_recording_round_trip(tmp_path):
+    path = str(tmp_path / "session.bin")
+    recording = InputRecording(7, InputRecording.FLAG_INFINITE_WORLD, [INPUT_UP] * 5 + [INPUT_LEFT] * 3,
+                               sim_rate=120, map_size=(40, 30), backend="python")
+    recording.save(path)
+    loaded = InputRecording.load(path)
+    assert (loaded.seed, loaded.states, loaded.sim_rate, loaded.map_size, loaded.backend) == \
+        (7, recording.states, 120, (40, 30), "python")
+    assert loaded.flags & InputRecording.FLAG_INFINITE_WORLD
+
+
+def test_load_rejects_every_truncation(tmp_path):
+    path = str(tmp_path / "session.bin")
+    InputRecording(7, states=[INPUT_UP] * 5 + [INPUT_LEFT] * 3).save(path)
+    with open(path, "rb") as f:
+        data = f.read()
+    for length in range(len(data)):
+        with open(path, "wb") as f:
+            f.write(data[:length])
+        with pytest.raises(ValueError):
+            InputRecording.load(path)
@@ -0,0 +1,18 @@
+import pytest
+
+from survival.config import INITIAL_TREE_DENSITY, FOREST_ITERATIONS
+from survival.generation import forest_step, forest_step_array, run_to_completion
+from survival.tiles import TileGrid
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.mark.parametrize("shape, density", [((1, 1), 0.5), ((17, 33), INITIAL_TREE_DENSITY), ((48, 40), 0.6)])
+def test_forest_step_array_applies_the_same_rules(shape, density):
+    # Every pass, edges included, must give the per-tile generator's grid
+    tiles = (np.random.default_rng(3).random(shape) < density).astype(np.uint8)
+    grid = TileGrid.from_array(tiles)
+    for _ in range(FOREST_ITERATIONS):
+        tiles = forest_step_array(tiles)
+        grid = run_to_completion(forest_step(grid))
+        assert bytes(grid.data) == tiles.tobytes()
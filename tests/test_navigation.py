@@ -0,0 +1,71 @@
+import random
+from collections import deque
+
+from survival.config import TILE_SIZE
+from survival.navigation import STEPS
+from survival.world import GameMap
+
+
+def reference_distances(game_map, target, left, top, width, height):
+    """Plain BFS from the target over the walkable tiles of a window"""
+    distances = {target: 0}
+    queue = deque([target])
+    while queue:
+        x, y = queue.popleft()
+        for dx, dy in STEPS:
+            tile = (x + dx, y + dy)
+            if (left <= tile[0] < left + width and top <= tile[1] < top + height and
+                    tile not in distances and not game_map.is_tree(*tile)):
+                distances[tile] = distances[(x, y)] + 1
+                queue.append(tile)
+    return distances
+
+
+def check_field(game_map, navigator):
+    target = navigator.target
+    expected = reference_distances(game_map, target, navigator.left, navigator.top,
+                                   navigator.width, navigator.height)
+    for y in range(navigator.top, navigator.top + navigator.height):
+        for x in range(navigator.left, navigator.left + navigator.width):
+            assert navigator.distance(x, y) == expected.get((x, y))
+            step = navigator.next_step(x, y)
+            if (x, y) == target:
+                assert step == (0, 0)
+            elif (x, y) in expected:
+                assert navigator.distance(x + step[0], y + step[1]) == expected[(x, y)] - 1
+            else:
+                assert step is None
+
+
+def test_flow_field_matches_bfs_after_tile_edits():
+    game_map = GameMap(48 * TILE_SIZE, 40 * TILE_SIZE, seed=4)
+    navigator = game_map.navigator()
+    navigator.radius = 12
+    rng = random.Random(4)
+    navigator.set_target(*game_map.open_tile_near(24, 20))
+    check_field(game_map, navigator)
+    for _ in range(60):
+        x = navigator.target[0] + rng.randint(-12, 12)
+        y = navigator.target[1] + rng.randint(-12, 12)
+        if game_map.in_bounds(x, y) and (x, y) != navigator.target:
+            game_map.set_tile(x, y, 1 - game_map.get_tile(x, y))
+            check_field(game_map, navigator)
+
+
+def test_cached_paths_follow_tile_edits():
+    game_map = GameMap(48 * TILE_SIZE, 40 * TILE_SIZE, seed=4)
+    navigator = game_map.navigator()
+    start = game_map.open_tile_near(5, 5)
+    goal = game_map.open_tile_near(40, 30)
+    path = navigator.find_path(start, goal)
+    expected = reference_distances(game_map, goal, 0, 0, game_map.width, game_map.height)
+    assert len(path) == expected[start] + 1
+    # Blocking the cached route must not return it again
+    blocked = path[len(path) // 2]
+    game_map.set_tile(*blocked, 1)
+    path = navigator.find_path(start, goal)
+    expected = reference_distances(game_map, goal, 0, 0, game_map.width, game_map.height)
+    assert blocked not in (path or ())
+    assert (path is None) == (start not in expected)
+    if path is not None:
+        assert len(path) == expected[start] + 1
@@ -0,0 +1,29 @@
+import math
+import random
+
+import pytest
+
+from survival.config import TILE_SIZE
+from survival.player import Player
+from survival.world import GameMap
+
+np = pytest.importorskip("numpy")
+
+
+def test_vectorized_cast_matches_scalar_dda():
+    game_map = GameMap(40 * TILE_SIZE, 30 * TILE_SIZE, seed=5)
+    rng = random.Random(5)
+    player = Player(0, 0)
+    checked = 0
+    while checked < 50:
+        tile_x, tile_y = rng.randrange(game_map.width), rng.randrange(game_map.height)
+        if game_map.is_tree(tile_x, tile_y):
+            continue
+        player.x = tile_x * TILE_SIZE + rng.uniform(0, TILE_SIZE - player.width)
+        player.y = tile_y * TILE_SIZE + rng.uniform(0, TILE_SIZE - player.height)
+        player.angle = rng.uniform(0, 2 * math.pi)
+        rays = player.cast_rays(game_map, 90)
+        batch = player.cast_rays_vectorized(game_map, 90)
+        assert batch.depths.tolist() == pytest.approx([ray.distance for ray in rays], abs=1e-6)
+        assert [side if side >= 0 else None for side in batch.sides.tolist()] == [ray.side for ray in rays]
+        checked += 1
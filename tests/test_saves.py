@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+from survival.config import TILE_SIZE
+from survival.items import ITEM_TYPES
+from survival.player import Player
+from survival.saves import SaveGame
+from survival.world import GameMap
+
+
+def test_save_over_loaded_save(tmp_path):
+    # Saving to the file the current tiles are mapped from must not truncate it under them
+    path = str(tmp_path / "savegame.bin")
+    game_map = GameMap(25 * TILE_SIZE, 18 * TILE_SIZE, seed=1)
+    player = Player(*Player(0, 0).find_safe_spawn(game_map))
+    SaveGame.save(path, game_map, player)
+    tiles = bytes(game_map.tiles.buffer())
+
+    SaveGame.load(path).apply(game_map, player)
+    SaveGame.save(path, game_map, player)
+    assert bytes(game_map.tiles.buffer()) == tiles
+    assert SaveGame.load(path).tiles.data == tiles
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_load_rejects_bad_view_mode_and_inventory_type(tmp_path):
+    path = str(tmp_path / "savegame.bin")
+    game_map = GameMap(25 * TILE_SIZE, 18 * TILE_SIZE, seed=1)
+    player = Player(0, 0)
+    player.inventory.add_item(ITEM_TYPES[0])
+    SaveGame.save(path, game_map, player)
+    with open(path, "rb") as f:
+        data = f.read()
+    view_offset = SaveGame.HEADER.size - 7  # The view mode byte precedes the item and inventory counts
+    inventory_offset = len(data) - SaveGame.INVENTORY_ENTRY.size
+    for offset in (view_offset, inventory_offset):
+        corrupt = bytearray(data)
+        corrupt[offset] = 200
+        with open(path, "wb") as f:
+            f.write(corrupt)
+        with pytest.raises(ValueError):
+            SaveGame.load(path)
+
+
+def test_save_releases_loaded_mapping(tmp_path):
+    # Windows cannot replace a file that is still mapped, so saving must let go of it first
+    path = str(tmp_path / "savegame.bin")
+    game_map = GameMap(25 * TILE_SIZE, 18 * TILE_SIZE, seed=1)
+    player = Player(0, 0)
+    SaveGame.save(path, game_map, player)
+    SaveGame.load(path).apply(game_map, player)
+    tiles = bytes(game_map.tiles.buffer())
+    SaveGame.save(path, game_map, player)
+    assert isinstance(game_map.tiles.data, bytearray)
+    assert bytes(game_map.tiles.buffer()) == tiles
+
+
+def test_round_trip_restores_everything(tmp_path):
+    path = str(tmp_path / "savegame.bin")
+    game_map = GameMap(30 * TILE_SIZE, 20 * TILE_SIZE, seed=2)
+    game_map.set_tile(3, 4, 1)
+    game_map.set_tile(5, 6, 0)
+    game_map.remove_items(list(game_map.items)[:2])
+    player = Player(123.25, 45.5)
+    player.angle = 1.75
+    player.view_mode = "first_person"
+    player.inventory.add_item(ITEM_TYPES[1])
+    player.inventory.add_item(ITEM_TYPES[1])
+    player.inventory.add_item(ITEM_TYPES[2])
+    game_map.reveal_around(player)
+    SaveGame.save(path, game_map, player, SaveGame.FLAG_CLUSTERING)
+
+    loaded_map = GameMap(25 * TILE_SIZE, 18 * TILE_SIZE, seed=9)
+    loaded_player = Player(0, 0)
+    saved = SaveGame.load(path)
+    saved.apply(loaded_map, loaded_player)
+    assert saved.flags == SaveGame.FLAG_CLUSTERING
+    assert loaded_map.seed == game_map.seed
+    assert (loaded_map.width, loaded_map.height) == (30, 20)
+    assert bytes(loaded_map.tiles.data) == bytes(game_map.tiles.data)
+    assert loaded_map.explored.data == game_map.explored.data
+    assert loaded_map.explored.count() > 0
+
+    def items(game_map):
+        store = game_map.items
+        return sorted((store.types[slot], store.xs[slot], store.ys[slot]) for slot in store)
+    assert items(loaded_map) == items(game_map)
+    assert ((loaded_player.x, loaded_player.y, loaded_player.angle, loaded_player.view_mode) ==
+            (123.25, 45.5, 1.75, "first_person"))
+    assert loaded_player.inventory.items == player.inventory.items